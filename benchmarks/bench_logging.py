@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+Event-loop lag during an alert burst with synchronous logging and with the queued pipeline.
+
+A burst of timers all expire at once. Each one logs its hop lines the way
+bot.py does and yields to the loop. A LoopMonitor sentinel records loop lag
+while the burst runs. Three setups are compared:
+
+    sync      logging.basicConfig StreamHandler with f-strings (the old setup)
+    queue     logs.setup_logging: lazy %-formatting, writes on a listener thread
+    sampled   queue, plus a Sampler keeping 1 in 10 per-hop lines
+
+Log output goes to a file through a stream that waits `--sink-us` per write,
+standing in for a container log pipe that is slower than the local disk.
+Use --sink-us 0 to write straight to the file.
+
+    python benchmarks/bench_logging.py
+    python benchmarks/bench_logging.py --timers 20000 --sink-us 0
+"""
+import argparse
+import asyncio
+import logging
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from logs import Sampler, setup_logging  # noqa: E402
+from monitor import LoopMonitor  # noqa: E402
+
+
+class _SlowSink:
+    """File-backed stream whose every write takes at least `delay` seconds."""
+
+    def __init__(self, path, delay):
+        self._file = open(path, "w", encoding="utf-8")
+        self._delay = delay
+
+    def write(self, data):
+        if self._delay:
+            deadline = time.perf_counter() + self._delay
+            while time.perf_counter() < deadline:
+                time.sleep(0)
+        return self._file.write(data)
+
+    def flush(self):
+        self._file.flush()
+
+
+async def _expire(timer_id, hops, logger, hop_logger, eager):
+    if eager:
+        logger.info(f"[Timer #{timer_id}] Hop {hops}/{hops} warning fired {0.012:.3f}s late")
+        logger.info(f"[Timer #{timer_id}] Hop {hops}/{hops} expired {0.004:.3f}s late")
+        logger.info(f"[Timer #{timer_id}] Completed all hops.")
+        await asyncio.sleep(0)
+        logger.info(f"[Timer #{timer_id}] Cleaned up.")
+        return
+    # text format: bot.py passes no context (extra=None), as only JSON lines use it
+    hop_logger.info("[Timer #%s] Hop %s/%s warning fired %.3fs late", timer_id, hops, hops, 0.012, extra=None)
+    hop_logger.info("[Timer #%s] Hop %s/%s expired %.3fs late", timer_id, hops, hops, 0.004, extra=None)
+    logger.info("[Timer #%s] Completed all hops.", timer_id, extra=None)
+    await asyncio.sleep(0)
+    logger.info("[Timer #%s] Cleaned up.", timer_id, extra=None)
+
+
+async def _child(args):
+    sink = _SlowSink(os.path.join(args.directory, "bot.log"), args.sink_us / 1e6)
+    if args.mode == "sync":
+        logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s", stream=sink)
+    else:
+        sys.stderr = sink  # setup_logging's StreamHandler writes to stderr
+        root_handler = setup_logging(logging.INFO)
+        sys.stderr = sys.__stderr__
+    logger = logging.getLogger("timer-bot")
+    hop_logger = logging.getLogger("timer-bot.hops")
+    if args.mode == "sampled":
+        hop_logger.addFilter(Sampler(10))
+
+    monitor = LoopMonitor(interval=0.005, threshold=3600.0, window=100_000)
+    monitor.start()
+    await asyncio.sleep(0.1)
+    monitor.samples.clear()
+    started = time.perf_counter()
+    await asyncio.gather(*(_expire(i + 1, 3, logger, hop_logger, args.mode == "sync") for i in range(args.timers)))
+    burst = time.perf_counter() - started
+    await asyncio.sleep(0.05)
+    lag = monitor.percentiles()
+    monitor.stop()
+    if args.mode != "sync":
+        drained = time.perf_counter()
+        root_handler.close()
+        drained = time.perf_counter() - drained
+    else:
+        drained = 0.0
+    print(f"{args.mode:<9} {burst * 1e3:10.1f} {lag['p50'] * 1e3:9.2f} {lag['p99'] * 1e3:9.2f} {lag['max'] * 1e3:9.1f} "
+          f"{drained * 1e3:11.1f}", file=sys.__stdout__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--timers", type=int, default=5000)
+    parser.add_argument("--sink-us", type=float, default=20.0)
+    parser.add_argument("--mode", choices=("sync", "queue", "sampled"))
+    parser.add_argument("--directory")
+    args = parser.parse_args()
+
+    if args.mode:
+        asyncio.run(_child(args))
+        return
+
+    print(f"{args.timers} timers expiring at once, 4 log lines each, {args.sink_us:g} us per write\n")
+    print(f"{'mode':<9} {'burst ms':>10} {'lag p50':>9} {'lag p99':>9} {'lag max':>9} {'drain ms':>11}")
+    for mode in ("sync", "queue", "sampled"):
+        with tempfile.TemporaryDirectory() as directory:
+            subprocess.run([sys.executable, os.path.abspath(__file__), "--mode", mode, "--timers", str(args.timers),
+                            "--sink-us", str(args.sink_us), "--directory", directory], check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Deadline-to-send latency of timer warnings with and without the prefetch stage.
+
+A burst of timers, one per channel, reaches T-5m at the same instant right after
+a restart, so no channel is in discord.py's cache. Checking send and @here
+permissions needs the full channel, which means fetching it over (simulated)
+REST. "inline" does that fetch in the warning handler at the deadline. That is
+what the deadline path has to do to check permissions without a prefetch stage;
+before the prefetch stage it skipped the check and sent through a partial
+channel. "prefetch" fetches PREFETCH_LEAD ahead and only enqueues at the
+deadline. The run reports the time spent in the warning handler per alert, and
+the time from each warning's deadline to its send request going out.
+
+    python benchmarks/bench_prefetch.py
+    python benchmarks/bench_prefetch.py --timers 2000 --fetch-ms 80
+"""
+import argparse
+import asyncio
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..")
+sys.path.insert(0, ROOT)
+
+LEAD = 2.0  # prefetch this long before the warning instead of 30s, to keep the run short
+
+
+class _Permissions:
+    send_messages = True
+    send_messages_in_threads = True
+    mention_everyone = True
+
+
+class _Guild:
+    me = object()
+
+
+SENT = {}  # timer id -> time its warning reached channel.send
+
+
+class _Channel:
+    guild = _Guild()
+
+    def __init__(self, channel_id):
+        self.id = channel_id
+
+    def permissions_for(self, member):
+        return _Permissions()
+
+    async def send(self, content, **kwargs):
+        timer_id = int(content.split("Timer #", 1)[1].split("*", 1)[0])
+        SENT.setdefault(timer_id, time.time())
+
+
+async def _child(args):
+    import logging
+    logging.disable(logging.INFO)
+    import bot
+    from delivery import TokenBucket
+
+    async def fetch_channel(channel_id):
+        await asyncio.sleep(args.fetch_ms / 1000)
+        return _Channel(channel_id)
+
+    bot.bot.get_channel = lambda channel_id: None  # cold cache after a restart
+    bot.bot.fetch_channel = fetch_channel
+    bot.bot.get_partial_messageable = lambda channel_id, guild_id=None: _Channel(channel_id)
+    bot.PREFETCH_LEAD = LEAD if args.mode == "prefetch" else 0
+    bot.dispatcher._global = TokenBucket(10 ** 9, 1.0, bot.dispatcher.clock())  # measure our path, not Discord's limit
+
+    handler = bot.execute_timer_warning
+    spent = []
+
+    async def timed(timer, hop):
+        t0 = time.perf_counter()
+        if args.mode == "inline" and timer.channel_id:
+            await bot.prefetch_channel(timer.channel_id)  # resolve the cold channel at the deadline
+        await handler(timer, hop)
+        spent.append(time.perf_counter() - t0)
+    bot.execute_timer_warning = timed
+
+    bot.resume_outbox()
+    bot.dispatcher.start()
+    bot.scheduler.start()
+    now = bot.scheduler.now()
+    for i in range(args.timers):
+        timer = bot.TimerData(id=i + 1, user_id=1, channel_id=10 ** 6 + i, guild_id=1,
+                              initial_duration=bot.WARNING_LEAD + LEAD + 1, region="EU",
+                              link=f"https://discord.gg/{i:08x}", start_time=now)
+        bot.active_timers.add(timer)
+        bot.start_timer(timer)
+    await asyncio.sleep(LEAD + 1 + 2 + args.timers / 2000 + args.fetch_ms / 1000)
+
+    due = {timer.id: timer.alert_time - bot.WARNING_LEAD for timer in bot.active_timers}
+    delays = [SENT[timer_id] - due[timer_id] for timer_id in SENT]
+    assert len(delays) == args.timers, f"only {len(delays)} of {args.timers} warnings sent"
+    print(f"{args.mode:<10} {sum(spent) / len(spent) * 1e6:12.1f} {sum(delays) / len(delays) * 1e3:14.2f} "
+          f"{max(delays) * 1e3:14.2f}")
+    bot.store.close()
+    bot.outbox.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--timers", type=int, default=500)
+    parser.add_argument("--fetch-ms", type=float, default=50.0)
+    parser.add_argument("--mode", choices=("inline", "prefetch"))
+    args = parser.parse_args()
+
+    if args.mode:
+        asyncio.run(_child(args))
+        return
+
+    print(f"{args.timers} warnings due at once, channel fetch {args.fetch_ms:g} ms\n")
+    print(f"{'mode':<10} {'handler us':>12} {'to send avg ms':>14} {'to send max ms':>14}")
+    for mode in ("inline", "prefetch"):
+        with tempfile.TemporaryDirectory() as directory:
+            env = dict(os.environ, DISCORD_TOKEN="bench", ALERT_COALESCE_WINDOW="0", ALERT_MAX_LEAD="0",
+                       STATE_DB=os.path.join(directory, "timers.db"), OUTBOX_DB=os.path.join(directory, "outbox.db"),
+                       DEAD_LETTER_PATH=os.path.join(directory, "dead_letters.jsonl"))
+            subprocess.run([sys.executable, os.path.abspath(__file__), "--mode", mode,
+                            "--timers", str(args.timers), "--fetch-ms", str(args.fetch_ms)],
+                           env=env, cwd=directory, check=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Bytes per timer record: the old dict-backed TimerData (discord objects + datetimes)
+versus the slotted, id-based one in models.py.
+
+    python benchmarks/bench_records.py
+    python benchmarks/bench_records.py --sizes 10000 100000
+"""
+import argparse
+import gc
+import os
+import sys
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from typing import Any, Optional
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from models import TimerData  # noqa: E402
+
+REGIONS = ("EU", "NA", "Asia", "Unknown")
+
+
+@dataclass
+class LegacyTimerData:
+    """TimerData as it was before it went id-based."""
+    id: int
+    user: Any
+    channel: Optional[Any]
+    initial_duration: int
+    region: str = "Unknown"
+    link: str = ""
+    hops: int = 1
+    remaining_hops: int = 1
+    start_time: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    alert_time: Optional[datetime] = None
+    event: Any = None
+
+
+class _Snowflake:
+    """Stand-in for a cached discord Member/channel; shared, so not counted per timer."""
+
+    def __init__(self, id: int):
+        self.id = id
+
+
+def _region(i: int) -> str:
+    # Every /timer call hands us a fresh str object, even for the same region name.
+    return "".join(REGIONS[i % len(REGIONS)])
+
+
+def build_legacy(n: int, users, channels):
+    now = datetime.now(timezone.utc)
+    return [
+        LegacyTimerData(
+            id=i, user=users[i % len(users)], channel=channels[i % len(channels)], initial_duration=5400,
+            region=_region(i), link=f"https://discord.gg/{i:08x}", hops=12, remaining_hops=12,
+            start_time=now, alert_time=now + timedelta(seconds=5400),
+        )
+        for i in range(n)
+    ]
+
+
+def build_compact(n: int, users, channels):
+    now = datetime.now(timezone.utc).timestamp()
+    return [
+        TimerData(
+            id=i, user_id=users[i % len(users)].id, channel_id=channels[i % len(channels)].id,
+            guild_id=1, initial_duration=5400, region=_region(i), link=f"https://discord.gg/{i:08x}",
+            hops=12, remaining_hops=12, start_time=now, alert_time=now + 5400,
+        )
+        for i in range(n)
+    ]
+
+
+def measure(build, n: int, users, channels) -> float:
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    records = build(n, users, channels)
+    used = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del records
+    gc.collect()
+    return used / n
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    args = parser.parse_args()
+
+    users = [_Snowflake(10**17 + i) for i in range(1000)]
+    channels = [_Snowflake(10**18 + i) for i in range(200)]
+    print("bytes per timer (record + its own strings/datetimes; shared discord objects not counted)\n")
+    print(f"{'timers':>10} {'before':>10} {'after':>10} {'saved':>8}")
+    for n in args.sizes:
+        before = measure(build_legacy, n, users, channels)
+        after = measure(build_compact, n, users, channels)
+        print(f"{n:>10,} {before:>10.0f} {after:>10.0f} {1 - after / before:>8.0%}")
+
+
+if __name__ == "__main__":
+    main()
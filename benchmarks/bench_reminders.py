@@ -0,0 +1,121 @@
+#!/usr/bin/env python3
+"""
+Cancel / list / fire-cleanup cost for users holding hundreds of reminders each:
+the old dict-of-lists layout versus ReminderRegistry.
+
+    python benchmarks/bench_reminders.py
+    python benchmarks/bench_reminders.py --users 2000 --per-user 500
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from models import ReminderData, ReminderRegistry  # noqa: E402
+
+KEYWORDS = ("boss", "super", "raids")
+
+
+def _reminders(users: int, per_user: int):
+    rnd = random.Random(7)
+    now = time.time()
+    reminders, rid = [], 1
+    for uid in range(1, users + 1):
+        for _ in range(per_user):
+            reminders.append(ReminderData(
+                id=rid, user_id=uid, channel_id=1, keyword=rnd.choice(KEYWORDS),
+                start_time=now, duration=rnd.randint(60, 86400),
+            ))
+            rid += 1
+    return reminders
+
+
+def _row(name: str, ops: int, seconds: float):
+    print(f"  {name:<34} {seconds / ops * 1e6:9.2f} us/op")
+
+
+# ------------------------------------------------------
+# Old layout: Dict[user_id, List[ReminderData]]
+# ------------------------------------------------------
+def bench_lists(reminders, rnd):
+    active = {}
+    for r in reminders:
+        active.setdefault(r.user_id, []).append(r)
+    users = list(active)
+    print("dict of lists")
+
+    t0 = time.perf_counter()
+    for uid in users:
+        lines = [(r.keyword, r.deadline) for r in active[uid]]
+    _row("list (per user)", len(users), time.perf_counter() - t0)
+
+    # /reminders cancel <keyword>, cancelling the most recently added match
+    victims = [lst[-1] for lst in active.values()]
+    t0 = time.perf_counter()
+    for victim in victims:
+        lst = active[victim.user_id]
+        for r in list(lst):
+            if r.keyword == victim.keyword and r.id == victim.id:
+                lst.remove(r)
+                break
+    _row("cancel by keyword + id", len(victims), time.perf_counter() - t0)
+
+    # _run_reminder cleanup for a random sample of reminders
+    firing = rnd.sample([r for lst in active.values() for r in lst], min(50_000, len(reminders) // 2))
+    t0 = time.perf_counter()
+    for r in firing:
+        lst = active.get(r.user_id)
+        if lst and r in lst:
+            lst.remove(r)
+            if not lst:
+                active.pop(r.user_id, None)
+    _row("fire cleanup", len(firing), time.perf_counter() - t0)
+    return lines
+
+
+# ------------------------------------------------------
+# ReminderRegistry
+# ------------------------------------------------------
+def bench_registry(reminders, rnd):
+    registry = ReminderRegistry()
+    for r in reminders:
+        registry.add(r)
+    users = list(registry._by_user)
+    print("ReminderRegistry")
+
+    t0 = time.perf_counter()
+    for uid in users:
+        lines = [(r.keyword, r.deadline) for r in registry.for_user(uid)]
+    _row("list (per user, deadline order)", len(users), time.perf_counter() - t0)
+
+    victims = [max(registry.for_user(uid), key=lambda r: r.id) for uid in users]
+    t0 = time.perf_counter()
+    for victim in victims:
+        registry.remove(registry.find(victim.user_id, victim.keyword, victim.id))
+    _row("cancel by keyword + id", len(victims), time.perf_counter() - t0)
+
+    firing = rnd.sample(list(registry._by_id.values()), min(50_000, len(reminders) // 2))
+    t0 = time.perf_counter()
+    for r in firing:
+        registry.remove(r)
+    _row("fire cleanup", len(firing), time.perf_counter() - t0)
+    return lines
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--per-user", type=int, default=300)
+    args = parser.parse_args()
+
+    reminders = _reminders(args.users, args.per_user)
+    print(f"{args.users:,} users x {args.per_user} reminders = {len(reminders):,} reminders\n")
+    bench_lists(reminders, random.Random(1))
+    bench_registry(reminders, random.Random(1))
+
+
+if __name__ == "__main__":
+    main()
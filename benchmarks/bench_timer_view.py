@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+/timers rendering from the materialized TimerView against rebuilding the list per call.
+
+For each size the registry is filled with timers spread over a few guilds,
+regions, channels and owners. The run reports the cost of keeping the view
+current (add, hop, remove) and, per query, the time to produce the message
+both ways: "rebuild" sorts the matching timers and renders every line as the
+old handler did, "view" takes the first lines that fit from the index.
+
+    python benchmarks/bench_timer_view.py
+    python benchmarks/bench_timer_view.py --sizes 1000 10000 100000 --queries 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from models import HOP_INTERVAL, TimerData, TimerRegistry  # noqa: E402
+from views import TimerView, fit_lines  # noqa: E402
+
+REGIONS = ["EU", "NA", "ASIA", "SA", "OCE"]
+HEADER = "**🕒 Active Timers:**"
+
+
+def _line(t):
+    alert_at = int(t.alert_time)
+    return f"**#{t.id}** — Region: **{t.region}**, Hops left: **{t.remaining_hops}**, Next: <t:{alert_at}:R> (<t:{alert_at}:T>)"
+
+
+def _rebuild(registry, limit=None, region=None, channel_id=None):
+    timers = [t for t in registry
+              if (region is None or t.region.casefold() == region.casefold())
+              and (channel_id is None or t.channel_id == channel_id)]
+    timers.sort(key=lambda t: (t.alert_time, t.id))
+    if limit is not None:
+        timers = timers[:limit]
+    return fit_lines(HEADER, [_line(t) for t in timers], len(timers))
+
+
+def _from_view(view, limit=None, region=None, channel_id=None):
+    total = view.count(region=region, channel_id=channel_id)
+    if limit is not None:
+        total = min(total, limit)
+    return fit_lines(HEADER, view.lines(limit, region=region, channel_id=channel_id), total)
+
+
+def _per_call(fn, calls):
+    t0 = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - t0) / calls * 1e6
+
+
+def run(size, queries, rng):
+    registry = TimerRegistry()
+    view = TimerView(_line)
+    registry.subscribe(view.on_change)
+    now = time.time()
+    timers = []
+    t0 = time.perf_counter()
+    for i in range(size):
+        timer = TimerData(id=i + 1, user_id=rng.randrange(500), channel_id=rng.randrange(200), guild_id=1,
+                          initial_duration=rng.randrange(60, 6 * 3600), region=rng.choice(REGIONS),
+                          hops=3, remaining_hops=3, start_time=now)
+        timer.alert_time = timer.anchor(0)
+        registry.add(timer)
+        timers.append(timer)
+    add_us = (time.perf_counter() - t0) / size * 1e6
+
+    hopped = rng.sample(timers, min(size, 1000))
+    t0 = time.perf_counter()
+    for timer in hopped:
+        timer.remaining_hops -= 1
+        timer.alert_time += HOP_INTERVAL
+        registry.update(timer)
+    hop_us = (time.perf_counter() - t0) / len(hopped) * 1e6
+
+    assert _from_view(view) == _rebuild(registry)
+    assert _from_view(view, 10, region="eu") == _rebuild(registry, 10, region="eu")
+
+    print(f"\n{size} timers: add {add_us:.1f} us, hop {hop_us:.1f} us per change")
+    print(f"  {'query':<26} {'rebuild us':>12} {'view us':>10} {'speedup':>8}")
+    for name, kwargs in (
+        ("full list", {}),
+        ("next 10", {"limit": 10}),
+        ("region", {"region": "EU"}),
+        ("channel", {"channel_id": 7}),
+        ("region + channel, next 5", {"region": "NA", "channel_id": 7, "limit": 5}),
+    ):
+        calls = max(1, queries * 1000 // size)
+        rebuild = _per_call(lambda: _rebuild(registry, **kwargs), calls)
+        viewed = _per_call(lambda: _from_view(view, **kwargs), queries)
+        print(f"  {name:<26} {rebuild:12.1f} {viewed:10.1f} {rebuild / viewed:7.0f}x")
+
+    removed = rng.sample(timers, min(size, 1000))
+    t0 = time.perf_counter()
+    for timer in removed:
+        registry.remove(timer)
+    print(f"  remove {(time.perf_counter() - t0) / len(removed) * 1e6:.1f} us per timer")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+    for size in args.sizes:
+        run(size, args.queries, rng)
+
+
+if __name__ == "__main__":
+    main()
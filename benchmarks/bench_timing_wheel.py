@@ -0,0 +1,179 @@
+#!/usr/bin/env python3
+"""
+Schedule/cancel cost of the timing wheel versus a plain heap and versus the old
+one-asyncio.Task-per-reminder model.
+
+    python benchmarks/bench_timing_wheel.py            # 1M entries
+    python benchmarks/bench_timing_wheel.py -n 100000
+"""
+import argparse
+import asyncio
+import gc
+import heapq
+import itertools
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from scheduler import ScheduledEvent, Scheduler  # noqa: E402
+
+# Same spread /reminder produces: a few minutes up to a couple of days.
+MIN_DELAY = 60
+MAX_DELAY = 2 * 86400
+
+
+async def _noop():
+    pass
+
+
+def _delays(n: int):
+    rnd = random.Random(42)
+    return [rnd.uniform(MIN_DELAY, MAX_DELAY) for _ in range(n)]
+
+
+def _report(name: str, n: int, schedule_s: float, cancel_s: float, cancelled: int, mem_bytes: int):
+    print(f"{name:<22} schedule {schedule_s / n * 1e9:8.0f} ns/op   "
+          f"cancel {cancel_s / cancelled * 1e9:8.0f} ns/op   "
+          f"memory {mem_bytes / n:6.0f} B/entry   ({mem_bytes / 2**20:,.0f} MiB)")
+
+
+def _traced(build) -> int:
+    """Bytes allocated by `build()` while its result is still alive."""
+    gc.collect()
+    tracemalloc.start()
+    base = tracemalloc.get_traced_memory()[0]
+    keep = build()
+    mem = tracemalloc.get_traced_memory()[0] - base
+    tracemalloc.stop()
+    del keep
+    gc.collect()
+    return mem
+
+
+# ------------------------------------------------------
+# Candidates
+# ------------------------------------------------------
+def bench_wheel(delays, cancel_every: int):
+    now = time.time()
+
+    def build():
+        scheduler = Scheduler(clock=lambda: now)
+        return scheduler, [scheduler.schedule(now + d, _noop) for d in delays]
+
+    mem = _traced(build)
+    gc.collect()
+    t0 = time.perf_counter()
+    scheduler, events = build()
+    schedule_s = time.perf_counter() - t0
+
+    victims = events[::cancel_every]
+    t0 = time.perf_counter()
+    for event in victims:
+        scheduler.cancel(event)
+    cancel_s = time.perf_counter() - t0
+    _report("timing wheel", len(delays), schedule_s, cancel_s, len(victims), mem)
+
+    # Walk the wheel through the whole range the way the run loop would.
+    wheel = scheduler._wheel
+    t0 = time.perf_counter()
+    fired = wakeups = 0
+    while len(wheel):
+        fired += len(wheel.advance(wheel.next_tick()))
+        wakeups += 1
+    drain_s = time.perf_counter() - t0
+    print(f"{'':<22} expired {fired:,} entries over {wakeups:,} wakeups in {drain_s:.2f}s")
+
+
+def bench_heap(delays, cancel_every: int):
+    now = time.time()
+
+    def build():
+        seq = itertools.count()
+        heap, events = [], []
+        for d in delays:
+            event = ScheduledEvent(now + d, _noop, ())
+            heapq.heappush(heap, (event.deadline, next(seq), event))
+            events.append(event)
+        return heap, events
+
+    mem = _traced(build)
+    gc.collect()
+    t0 = time.perf_counter()
+    heap, events = build()
+    schedule_s = time.perf_counter() - t0
+
+    victims = events[::cancel_every]
+    t0 = time.perf_counter()
+    for event in victims:
+        event.active = False
+    cancel_s = time.perf_counter() - t0
+    _report("binary heap (lazy)", len(delays), schedule_s, cancel_s, len(victims), mem)
+
+
+def bench_tasks(delays, cancel_every: int):
+    async def sleeper(delay: float):
+        await asyncio.sleep(delay)
+
+    async def build():
+        tasks = [asyncio.create_task(sleeper(d)) for d in delays]
+        await asyncio.sleep(0)  # let every task reach its asyncio.sleep
+        return tasks
+
+    async def teardown(tasks):
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def run():
+        gc.collect()
+        tracemalloc.start()
+        base = tracemalloc.get_traced_memory()[0]
+        tasks = await build()
+        mem = tracemalloc.get_traced_memory()[0] - base
+        tracemalloc.stop()
+        await teardown(tasks)
+        del tasks
+        gc.collect()
+
+        t0 = time.perf_counter()
+        tasks = await build()
+        schedule_s = time.perf_counter() - t0
+
+        victims = tasks[::cancel_every]
+        t0 = time.perf_counter()
+        for task in victims:
+            task.cancel()
+        await asyncio.sleep(0)
+        cancel_s = time.perf_counter() - t0
+        _report("task + asyncio.sleep", len(delays), schedule_s, cancel_s, len(victims), mem)
+        await teardown(tasks)
+
+    asyncio.run(run())
+
+
+# ------------------------------------------------------
+# Entry point
+# ------------------------------------------------------
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-n", type=int, default=1_000_000, help="number of scheduled entries")
+    parser.add_argument("--cancel-every", type=int, default=10, help="cancel every k-th entry")
+    parser.add_argument("--skip-tasks", action="store_true", help="skip the per-task baseline (needs several GiB at 1M)")
+    args = parser.parse_args()
+
+    delays = _delays(args.n)
+    print(f"{args.n:,} entries, delays {MIN_DELAY}s..{MAX_DELAY}s, cancelling every {args.cancel_every}th\n")
+    bench_wheel(delays, args.cancel_every)
+    gc.collect()
+    bench_heap(delays, args.cancel_every)
+    gc.collect()
+    if not args.skip_tasks:
+        bench_tasks(delays, args.cancel_every)
+
+
+if __name__ == "__main__":
+    main()
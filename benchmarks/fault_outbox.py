@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Fault injection for the alert outbox: kill the process at every step of an alert's
+way out, restart it, and check that every alert reached the channel exactly once.
+
+A child process fires alerts through the real Outbox, Coalescer and Dispatcher.
+"Discord" is a SQLite table that, like the real API with enforce_nonce, ignores a
+second message carrying a nonce it has already seen. The child is killed with
+os._exit right after one of these steps:
+
+    recorded  alert and its key committed to the outbox
+    packed    alert replaced by its message in the outbox
+    posted    Discord has the message, acknowledgement not yet processed
+    acked     message removed from the outbox
+
+It is then restarted without a crash, resumes the outbox and fires every alert
+again, as restored timers would.
+
+    python benchmarks/fault_outbox.py
+    python benchmarks/fault_outbox.py --alerts 200
+"""
+import argparse
+import asyncio
+import os
+import re
+import shutil
+import sqlite3
+import subprocess
+import sys
+import tempfile
+from collections import Counter
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from delivery import Alert, Coalescer, Dispatcher  # noqa: E402
+from outbox import Outbox  # noqa: E402
+
+STEPS = ("recorded", "packed", "posted", "acked")
+CRASH_EXIT = 86
+CHANNELS = 3
+
+
+# ------------------------------------------------------
+# Child: one run of the bot's alert path
+# ------------------------------------------------------
+class _Crash:
+    def __init__(self, step, at):
+        self.step = step
+        self.at = at
+        self.seen = 0
+
+    def __call__(self, step):
+        if step == self.step:
+            self.seen += 1
+            if self.seen == self.at:
+                os._exit(CRASH_EXIT)
+
+
+class _CrashingOutbox(Outbox):
+    def __init__(self, path, crash):
+        super().__init__(path)
+        self.crash = crash
+
+    def _add_messages(self, *args):
+        created = super()._add_messages(*args)
+        self.crash("packed")
+        return created
+
+    def _remove(self, message_id):
+        super()._remove(message_id)
+        self.crash("acked")
+
+
+async def child(directory, alerts, crash):
+    outbox = _CrashingOutbox(os.path.join(directory, "outbox.db"), crash)
+    discord = sqlite3.connect(os.path.join(directory, "discord.db"), isolation_level=None)
+    discord.execute("CREATE TABLE IF NOT EXISTS posts (nonce TEXT PRIMARY KEY, channel_id INTEGER, content TEXT)")
+
+    async def send(message):
+        discord.execute("INSERT OR IGNORE INTO posts VALUES (?, ?, ?)",
+                        (message.nonce, message.channel_id, message.content))
+        crash("posted")
+
+    def done(message, delivered):
+        if message.ref is not None:
+            outbox.remove(message.ref)
+
+    dispatcher = Dispatcher(send, workers=2, channel_rate=(1000, 1.0), global_rate=(1000, 1.0), on_done=done)
+    coalescer = Coalescer(dispatcher, window=0.01, outbox=outbox)
+
+    # Same order as bot.main(): resume the outbox, then let the "timers" fire.
+    pending_alerts, pending_messages = outbox.open()
+    for row in pending_messages:
+        dispatcher.enqueue(row["channel_id"], row["content"], row["priority"], row["guild_id"],
+                           row["expires_at"], row["id"], row["nonce"])
+    for row in pending_alerts:
+        alert = Alert.from_dict(row["payload"])
+        alert.ref = row["id"]
+        coalescer.add(row["channel_id"], alert, row["guild_id"])
+    dispatcher.start()
+
+    for i in range(alerts):
+        alert = Alert(text=f"alert #{i}", line=f"alert #{i}", priority=0)
+        payload = alert.as_dict()
+        alert.ref = await outbox.transact(
+            lambda box: box.add_alert(i % CHANNELS, None, payload) if box.claim([f"alert:{i}"]) else None)
+        if alert.ref is None:
+            continue
+        crash("recorded")
+        coalescer.add(i % CHANNELS, alert)
+        if i % 7 == 0:
+            await asyncio.sleep(0.005)
+
+    while len(outbox) or dispatcher.depth:
+        await asyncio.sleep(0.01)
+    outbox.close()
+
+
+# ------------------------------------------------------
+# Parent: crash, restart, count
+# ------------------------------------------------------
+def _run(directory, alerts, step=None, at=0):
+    cmd = [sys.executable, os.path.abspath(__file__), "--child", directory, "--alerts", str(alerts)]
+    if step:
+        cmd += ["--crash-step", step, "--crash-at", str(at)]
+    return subprocess.run(cmd, timeout=120).returncode
+
+
+def _deliveries(directory):
+    conn = sqlite3.connect(os.path.join(directory, "discord.db"))
+    counts = Counter()
+    for content, in conn.execute("SELECT content FROM posts"):
+        counts.update(int(n) for n in re.findall(r"alert #(\d+)\b", content))
+    conn.close()
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--alerts", type=int, default=60)
+    parser.add_argument("--child", metavar="DIR")
+    parser.add_argument("--crash-step", choices=STEPS)
+    parser.add_argument("--crash-at", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.child:
+        asyncio.run(child(args.child, args.alerts, _Crash(args.crash_step, args.crash_at)))
+        return
+
+    failures = 0
+    print(f"{'step':<10} {'crash at':>8} {'crashed':>8} {'missing':>8} {'repeated':>9}")
+    for step in STEPS:
+        for at in (1, 3, 8):
+            directory = tempfile.mkdtemp(prefix="outbox-fault-")
+            try:
+                crashed = _run(directory, args.alerts, step, at) == CRASH_EXIT
+                if _run(directory, args.alerts) != 0:
+                    raise SystemExit(f"restart after {step} #{at} did not finish cleanly")
+                counts = _deliveries(directory)
+            finally:
+                shutil.rmtree(directory)
+            missing = sum(1 for i in range(args.alerts) if counts[i] == 0)
+            repeated = sum(1 for n in counts.values() if n > 1)
+            failures += bool(missing or repeated)
+            print(f"{step:<10} {at:>8} {'yes' if crashed else 'no':>8} {missing:>8} {repeated:>9}")
+    print("\nexactly once" if not failures else f"\n{failures} scenario(s) lost or repeated alerts")
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
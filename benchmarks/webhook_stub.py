@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+WebhookSender against a local stub of the Discord webhook endpoints.
+
+The stub implements listing/creating channel webhooks and executing them, and
+records which TCP connection every request arrived on. The run checks that:
+
+    - every message arrives, in order per channel
+    - each channel's webhook is looked up once and then served from the cache
+    - requests share a small pool of keep-alive connections
+    - a webhook deleted on the server side is replaced transparently
+    - a channel without the Manage Webhooks permission falls back to the bot
+
+and compares throughput with opening a fresh session per message.
+
+    python benchmarks/webhook_stub.py
+    python benchmarks/webhook_stub.py --channels 20 --messages 2000
+"""
+import argparse
+import asyncio
+import itertools
+import os
+import sys
+import time
+
+import aiohttp
+from aiohttp import web
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from webhooks import WebhookSender  # noqa: E402
+
+FORBIDDEN_CHANNEL = 999
+
+
+class StubDiscord:
+    def __init__(self):
+        self.hooks = {}            # webhook id -> {"id", "token", "name", "channel_id"}
+        self.posts = {}            # channel id -> [content, ...]
+        self.peers = set()
+        self.lookups = 0
+        self._ids = itertools.count(1)
+        self.app = web.Application()
+        self.app.router.add_get("/channels/{channel_id}/webhooks", self.list_hooks)
+        self.app.router.add_post("/channels/{channel_id}/webhooks", self.create_hook)
+        self.app.router.add_post("/webhooks/{hook_id}/{token}", self.execute)
+
+    def _seen(self, request):
+        self.peers.add(request.transport.get_extra_info("peername"))
+
+    async def list_hooks(self, request):
+        self._seen(request)
+        self.lookups += 1
+        channel_id = int(request.match_info["channel_id"])
+        if channel_id == FORBIDDEN_CHANNEL:
+            return web.json_response({"message": "Missing Permissions"}, status=403)
+        return web.json_response([h for h in self.hooks.values() if h["channel_id"] == channel_id])
+
+    async def create_hook(self, request):
+        self._seen(request)
+        body = await request.json()
+        hook_id = next(self._ids)
+        hook = self.hooks[hook_id] = {
+            "id": str(hook_id), "token": f"tok{hook_id}", "name": body["name"],
+            "channel_id": int(request.match_info["channel_id"]),
+        }
+        return web.json_response(hook)
+
+    async def execute(self, request):
+        self._seen(request)
+        hook = self.hooks.get(int(request.match_info["hook_id"]))
+        if hook is None or hook["token"] != request.match_info["token"]:
+            return web.json_response({"message": "Unknown Webhook"}, status=404)
+        body = await request.json()
+        self.posts.setdefault(hook["channel_id"], []).append(body["content"])
+        return web.json_response({"id": "1", "channel_id": str(hook["channel_id"]), "content": body["content"]})
+
+
+async def _send_all(sender, channels, messages):
+    async def channel_worker(channel_id):
+        # the dispatcher serves a channel from one worker at a time
+        for i in range(messages // len(channels)):
+            await sender.send(channel_id, f"{channel_id}:{i}")
+    await asyncio.gather(*(channel_worker(c) for c in channels))
+
+
+async def _fresh_sessions(channel_url, messages):
+    for i in range(messages):
+        async with aiohttp.ClientSession() as session:
+            async with session.post(channel_url, json={"content": f"x{i}"}) as response:
+                await response.read()
+
+
+def _check(name, ok):
+    print(f"  {'ok  ' if ok else 'FAIL'} {name}")
+    return ok
+
+
+async def run(args):
+    stub = StubDiscord()
+    runner = web.AppRunner(stub.app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    base = f"http://127.0.0.1:{port}"
+
+    channels = list(range(1, args.channels + 1))
+    sender = WebhookSender("stub-token", channels + [FORBIDDEN_CHANNEL], api_base=base, connections=args.connections)
+    await sender.start()
+    results = []
+    try:
+        t0 = time.perf_counter()
+        await _send_all(sender, channels, args.messages)
+        pooled = time.perf_counter() - t0
+        per_channel = args.messages // len(channels)
+        results.append(_check("all messages delivered in order", all(
+            stub.posts.get(c) == [f"{c}:{i}" for i in range(per_channel)] for c in channels)))
+        results.append(_check(f"one lookup per channel ({stub.lookups} for {len(channels)})",
+                              stub.lookups == len(channels)))
+        results.append(_check(f"pooled connections ({len(stub.peers)} for {per_channel * len(channels)} requests)",
+                              len(stub.peers) <= args.connections))
+
+        victim = channels[0]
+        for hook_id, hook in list(stub.hooks.items()):
+            if hook["channel_id"] == victim:
+                del stub.hooks[hook_id]
+        await sender.send(victim, "after delete")
+        results.append(_check("deleted webhook is replaced", stub.posts[victim][-1] == "after delete"))
+
+        delivered = await sender.send(FORBIDDEN_CHANNEL, "nope")
+        results.append(_check("no permission falls back to the bot",
+                              delivered is False and not sender.handles(FORBIDDEN_CHANNEL)))
+
+        url = next(iter(sender._urls.values()))
+        t0 = time.perf_counter()
+        await _fresh_sessions(url, min(args.messages, 500))
+        fresh = (time.perf_counter() - t0) / min(args.messages, 500)
+        print(f"\n  pooled session      {per_channel * len(channels) / pooled:9.0f} msg/s")
+        print(f"  session per message {1 / fresh:9.0f} msg/s")
+    finally:
+        await sender.close()
+        await runner.cleanup()
+    return all(results)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--channels", type=int, default=10)
+    parser.add_argument("--messages", type=int, default=1000)
+    parser.add_argument("--connections", type=int, default=20)
+    args = parser.parse_args()
+    sys.exit(0 if asyncio.run(run(args)) else 1)
+
+
+if __name__ == "__main__":
+    main()
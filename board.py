@@ -0,0 +1,152 @@
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+logger = logging.getLogger("timer-bot")
+
+BOARD_INTERVAL = 15.0  # at most one edit per board per this many seconds
+EDITS_PER_TICK = 5     # across all boards, per second
+
+
+class _Board:
+    __slots__ = ("message_id", "dirty", "last_edit")
+
+    def __init__(self, message_id: Optional[int] = None):
+        self.message_id = message_id
+        self.dirty = True
+        self.last_edit = float("-inf")
+
+
+class BoardManager:
+    """
+    One persistent message per opted-in channel listing that channel's timers.
+
+    Changes only mark a board dirty; a background task publishes dirty boards,
+    each at most once per `interval` seconds and at most `edits_per_tick` in
+    total every second, so however busy a channel gets the write rate stays
+    fixed. Which channels have a board, and the id of each board's message, are
+    kept in a small JSON file so a restart keeps editing the same messages.
+
+    `publish(channel_id, message_id, content)` edits the message (or posts a new
+    one when `message_id` is None or gone) and returns the id it ended up with.
+    `delete(channel_id, message_id)` removes a message that was posted for a board
+    disabled while the post was in flight.
+    """
+
+    def __init__(self, publish: Callable[[int, Optional[int], str], Awaitable[int]],
+                 render: Callable[[int], str], delete: Callable[[int, int], Awaitable[None]], path: str,
+                 interval: float = BOARD_INTERVAL, edits_per_tick: int = EDITS_PER_TICK,
+                 clock: Callable[[], float] = time.monotonic):
+        self._publish = publish
+        self._render = render
+        self._delete = delete
+        self.path = path
+        self.interval = interval
+        self.edits_per_tick = edits_per_tick
+        self.clock = clock
+        self._boards: Dict[int, _Board] = {}
+        self._task: Optional[asyncio.Task] = None
+        self.edits = 0
+        self.changes = 0
+
+    def __contains__(self, channel_id: Optional[int]) -> bool:
+        return channel_id in self._boards
+
+    def __len__(self) -> int:
+        return len(self._boards)
+
+    def load(self):
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as exc:
+            logger.error("Could not read boards from %s: %s", self.path, exc)
+            return
+        for channel_id, message_id in saved.items():
+            self._boards[int(channel_id)] = _Board(message_id)
+        logger.info("📋 Loaded %s boards from %s", len(self._boards), self.path)
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run(), name="boards")
+        return self._task
+
+    def enable(self, channel_id: int) -> bool:
+        """Give `channel_id` a board; False if it already has one."""
+        if channel_id in self._boards:
+            return False
+        self._boards[channel_id] = _Board()
+        self._save()
+        return True
+
+    def disable(self, channel_id: int) -> Optional[int]:
+        """Stop maintaining the board; returns its message id so the caller can delete it."""
+        board = self._boards.pop(channel_id, None)
+        if board is None:
+            return None
+        self._save()
+        return board.message_id
+
+    def touch(self, channel_id: Optional[int]):
+        """Something shown on the channel's board changed."""
+        board = self._boards.get(channel_id)
+        if board is not None:
+            board.dirty = True
+            self.changes += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "boards": len(self._boards),
+            "dirty": sum(1 for board in self._boards.values() if board.dirty),
+            "changes": self.changes,
+            "edits": self.edits,
+        }
+
+    # --------------------------------------------------
+    # Internals
+    # --------------------------------------------------
+    async def _run(self):
+        while True:
+            await asyncio.sleep(1.0)
+            now = self.clock()
+            due = [
+                (channel_id, board) for channel_id, board in self._boards.items()
+                if board.dirty and now - board.last_edit >= self.interval
+            ]
+            due.sort(key=lambda item: item[1].last_edit)  # longest-waiting boards first
+            for channel_id, board in due[:self.edits_per_tick]:
+                await self._edit(channel_id, board)
+
+    async def _edit(self, channel_id: int, board: _Board):
+        board.dirty = False
+        board.last_edit = self.clock()
+        try:
+            message_id = await self._publish(channel_id, board.message_id, self._render(channel_id))
+        except Exception as exc:
+            board.dirty = True  # try again next interval
+            logger.warning("Failed to update board in channel %s: %s", channel_id, exc)
+            return
+        self.edits += 1
+        if message_id == board.message_id:
+            return
+        if self._boards.get(channel_id) is not board:
+            # disabled meanwhile: whoever disabled it only knew the old message
+            await self._delete(channel_id, message_id)
+            return
+        board.message_id = message_id
+        self._save()
+
+    def _save(self):
+        data = {str(channel_id): board.message_id for channel_id, board in self._boards.items()}
+        tmp = f"{self.path}.tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                json.dump(data, f)
+            os.replace(tmp, self.path)
+        except OSError as exc:
+            logger.error("Could not save boards to %s: %s", self.path, exc)
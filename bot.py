@@ -1,18 +1,32 @@
 #!/usr/bin/env python3
 import os
 import re
+import hmac
+import time
 import asyncio
 import logging
-from dataclasses import dataclass, field
-from datetime import datetime, timedelta, timezone
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
 
 from dotenv import load_dotenv
 import discord
 from discord import Interaction, app_commands
 from discord.ext import commands
+import aiohttp
 from aiohttp import web  # used for keepalive
 
+from board import BoardManager
+from delivery import PRIORITY_REMINDER, PRIORITY_WARNING, Alert, Coalescer, DeadLetterQueue, Dispatcher, OutboundMessage
+from logs import Sampler, setup_logging
+from metrics import CONTENT_TYPE, CommandMetrics, MetricsRegistry
+from monitor import LoopMonitor, Watchdog
+from models import WARNING_LEAD, ReminderData, ReminderGroup, ReminderRegistry, TimerData, TimerRegistry
+from outbox import Outbox
+from scheduler import Scheduler
+from storage import JournalStore, TimerStore
+from views import ResponseCache, TimerView, fit_lines
+from webhooks import API_BASE, WebhookError, WebhookSender
+
 # ------------------------------------------------------
 # Configuration
 # ------------------------------------------------------
@@ -21,6 +35,38 @@ load_dotenv()
 DISCORD_TOKEN = os.getenv("DISCORD_TOKEN")
 GUILD_ID = os.getenv("GUILD_ID")
 PORT = int(os.getenv("PORT", 8080))
+STATE_BACKEND = os.getenv("STATE_BACKEND", "sqlite").lower()  # "sqlite" or "journal"
+STATE_DB = os.getenv("STATE_DB", "timers.db")
+STATE_DIR = os.getenv("STATE_DIR", "state")
+SEND_WORKERS = int(os.getenv("SEND_WORKERS", 4))
+ALERT_COALESCE_WINDOW = float(os.getenv("ALERT_COALESCE_WINDOW", 2.0))  # seconds, 0 disables
+REMINDER_GRANULARITY = float(os.getenv("REMINDER_GRANULARITY", 60))  # seconds, 0 disables grouping
+DEAD_LETTER_PATH = os.getenv("DEAD_LETTER_PATH", "dead_letters.jsonl")
+OUTBOX_DB = os.getenv("OUTBOX_DB", "outbox.db")
+# Alert channels that post through a webhook instead of the bot, e.g. "123,456"
+WEBHOOK_CHANNELS = [int(c) for c in os.getenv("WEBHOOK_CHANNELS", "").replace(" ", "").split(",") if c]
+DISCORD_API_BASE = os.getenv("DISCORD_API_BASE", API_BASE)
+ALERT_MAX_LEAD = float(os.getenv("ALERT_MAX_LEAD", 10))  # seconds alerts may be raised early, 0 disables
+PREFETCH_LEAD = float(os.getenv("PREFETCH_LEAD", 30))  # seconds before an alert to prepare it, 0 disables
+BOARD_PATH = os.getenv("BOARD_PATH", "boards.json")
+BOARD_INTERVAL = float(os.getenv("BOARD_INTERVAL", 15))  # min seconds between edits of one board
+# "discord": <t:…:R> timestamps the client keeps current (responses are cached); "text": "in 1h5m"
+TIMESTAMP_STYLE = os.getenv("TIMESTAMP_STYLE", "discord").lower()
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", 1024))  # cached command responses kept, least recent dropped
+LOOP_SENTINEL_INTERVAL = float(os.getenv("LOOP_SENTINEL_INTERVAL", 0.02))  # seconds between loop lag samples
+LOOP_SLOW_THRESHOLD = float(os.getenv("LOOP_SLOW_THRESHOLD", 0.1))  # lag that gets its stack captured and logged
+# bearer token for the diagnostics (/loop, per-command /stats); unset, only localhost may read them
+DIAGNOSTICS_TOKEN = os.getenv("DIAGNOSTICS_TOKEN", "")
+WATCHDOG_TIMEOUT = float(os.getenv("WATCHDOG_TIMEOUT", 10))  # seconds the loop may miss its heartbeat, 0 disables
+WATCHDOG_PATH = os.getenv("WATCHDOG_PATH", "watchdog.log")
+# "1": after the stack dump, flush queued state writes and exit so the supervisor restarts us
+WATCHDOG_RESTART = os.getenv("WATCHDOG_RESTART", "0") == "1"
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()
+LOG_FORMAT = os.getenv("LOG_FORMAT", "text").lower()  # "text" or "json" (one object per line)
+LOG_FILE = os.getenv("LOG_FILE", "")  # also write to this file, rotated by size
+LOG_MAX_BYTES = int(os.getenv("LOG_MAX_BYTES", 10 * 1024 * 1024))
+LOG_BACKUPS = int(os.getenv("LOG_BACKUPS", 5))
+LOG_HOP_SAMPLE = int(os.getenv("LOG_HOP_SAMPLE", 1))  # keep 1 in N per-hop info lines
 
 if not DISCORD_TOKEN:
     raise RuntimeError("❌ DISCORD_TOKEN not found in environment")
@@ -33,33 +79,14 @@ except ValueError:
 # ------------------------------------------------------
 # Logging setup
 # ------------------------------------------------------
-logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(message)s")
+# Records are formatted and written by a listener thread, never on the event loop.
+setup_logging(getattr(logging, LOG_LEVEL, logging.INFO), LOG_FORMAT == "json", LOG_FILE or None,
+              LOG_MAX_BYTES, LOG_BACKUPS)
 logger = logging.getLogger("timer-bot")
-
-# ------------------------------------------------------
-# Data Models
-# ------------------------------------------------------
-@dataclass
-class TimerData:
-    id: int
-    user: Any
-    channel: Optional[Any]
-    initial_duration: int
-    region: str = "Unknown"
-    link: str = ""
-    hops: int = 1
-    remaining_hops: int = 1
-    start_time: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
-    alert_time: Optional[datetime] = None
-    task: Optional[asyncio.Task] = None
-
-
-@dataclass
-class ReminderData:
-    keyword: str
-    start_time: datetime
-    duration: int
-    task: Optional[asyncio.Task] = None
+# Per-hop progress of every timer: the bulk of the log at high timer counts.
+hop_logger = logging.getLogger("timer-bot.hops")
+hop_sampler = Sampler(LOG_HOP_SAMPLE)
+hop_logger.addFilter(hop_sampler)
 
 # ------------------------------------------------------
 # Discord Bot Setup
@@ -68,14 +95,21 @@ intents = discord.Intents.default()
 intents.message_content = True
 bot = commands.Bot(command_prefix="/", intents=intents)
 
-active_timers: List[TimerData] = []
-active_reminders: Dict[int, List[ReminderData]] = {}
+active_timers = TimerRegistry()
+active_reminders = ReminderRegistry(REMINDER_GRANULARITY)
 _timer_id_counter = 1
+_reminder_id_counter = 1
 _timer_lock = asyncio.Lock()
+scheduler = Scheduler()
+store = JournalStore(STATE_DIR) if STATE_BACKEND == "journal" else TimerStore(STATE_DB)
 
 # ------------------------------------------------------
 # Utility Functions
 # ------------------------------------------------------
+# free-text /timer options; keeps every alert line far inside one message
+REGION_MAX_LENGTH = 50
+LINK_MAX_LENGTH = 200
+
 def parse_time_string(time_str: str) -> int:
     cleaned = time_str.replace(" ", "").lower()
     pattern = r'(?:(\d+)h)?(?:(\d+)m)?$'
@@ -96,95 +130,511 @@ def humanize_seconds(seconds: int) -> str:
         return f"{hours}h{minutes}m"
     return f"{minutes}m"
 
+def format_due(epoch: float) -> str:
+    if TIMESTAMP_STYLE == "discord":
+        return f"<t:{int(epoch)}:R> (<t:{int(epoch)}:T>)"
+    return f"in {humanize_seconds(max(0, int(epoch - time.time())))}"
+
 # ------------------------------------------------------
 # Timer Logic
 # ------------------------------------------------------
-async def execute_timer(timer: TimerData):
-    timer_id = timer.id
-    try:
-        for hop in range(timer.hops):
-            duration = timer.initial_duration if hop == 0 else 7200
-            timer.remaining_hops = timer.hops - hop
-            now = datetime.now(timezone.utc)
-            timer.alert_time = now + timedelta(seconds=duration)
-
-            logger.info(f"[Timer #{timer_id}] Hop {hop+1}/{timer.hops} -> waiting {duration}s")
-
-            if duration > 300:
-                await asyncio.sleep(duration - 300)
-                if timer not in active_timers:
-                    return
-                if timer.channel:
-                    await safe_send(timer.channel,
-                        f"@here ⚠️ **Timer #{timer_id}** - bosses in 5 minutes!\n"
-                        f"🌍 Region: *{timer.region}*\n🔗 {timer.link or 'No link provided'}"
-                    )
-                await asyncio.sleep(300)
-            else:
-                await asyncio.sleep(duration)
-
-        logger.info(f"[Timer #{timer_id}] Completed all hops.")
-    except asyncio.CancelledError:
-        logger.info(f"[Timer #{timer_id}] Cancelled.")
-        raise
-    finally:
-        if timer in active_timers:
-            active_timers.remove(timer)
-            logger.info(f"[Timer #{timer_id}] Cleaned up.")
+def _log_context(timer: TimerData) -> Optional[Dict[str, Any]]:
+    # Only JSON lines show these fields; skip building them for the text format.
+    if LOG_FORMAT != "json":
+        return None
+    return {"timer_id": timer.id, "user_id": timer.user_id, "guild_id": timer.guild_id}
+
+def start_timer(timer: TimerData):
+    _schedule_hop(timer, 0)
+
+def _schedule_hop(timer: TimerData, hop: int):
+    timer.remaining_hops = timer.hops - hop
+    timer.alert_time = timer.anchor(hop)
+    active_timers.update(timer)
+    if hop > 0:
+        store.timer_hopped(timer)
+
+    hop_logger.info("[Timer #%s] Hop %s/%s -> waiting %.0fs", timer.id, hop+1, timer.hops,
+                    max(0, timer.alert_time - scheduler.now()), extra=_log_context(timer))
+    _arm_timer(timer, hop)
+
+def _arm_timer(timer: TimerData, hop: int):
+    # Prefetch, warning and expiry all hang off the hop's anchor, never off "now".
+    alert_at = timer.alert_time
+    warning_at = alert_at - WARNING_LEAD
+    if warning_at - PREFETCH_LEAD > scheduler.now() and PREFETCH_LEAD > 0:
+        timer.event = scheduler.schedule(warning_at - PREFETCH_LEAD, prefetch_timer_warning, timer, hop)
+    elif warning_at > scheduler.now():
+        _arm_warning(timer, hop)
+    else:
+        timer.event = scheduler.schedule(alert_at, execute_timer, timer, hop)
+
+def _arm_warning(timer: TimerData, hop: int):
+    # raised early by the channel's recent delivery delay, so it lands on T-5m
+    lead = dispatcher.expected_delay(timer.channel_id)
+    timer.event = scheduler.schedule(timer.alert_time - WARNING_LEAD - lead, execute_timer_warning, timer, hop)
+
+async def prefetch_timer_warning(timer: TimerData, hop: int):
+    """Resolve the channel and build the warning ahead of time, so the deadline only enqueues it."""
+    if timer not in active_timers:
+        return
+    _arm_warning(timer, hop)
+    if timer.channel_id:
+        channel = await prefetch_channel(timer.channel_id)
+        if timer not in active_timers:
+            return  # cancelled while the channel was being fetched
+        _prepared_warnings[timer.id] = (hop, _warning_alert(timer, channel))
+
+def _warning_alert(timer: TimerData, channel) -> Alert:
+    link = timer.link or 'No link provided'
+    can_send, can_ping = _channel_permissions(channel)
+    if not can_send:
+        logger.warning("[Timer #%s] Missing permission to send in channel %s", timer.id, timer.channel_id,
+                       extra=_log_context(timer))
+    return Alert(
+        text=f"@here ⚠️ **Timer #{timer.id}** - bosses in 5 minutes!\n🌍 Region: *{timer.region}*\n🔗 {link}",
+        line=f"⚠️ **Timer #{timer.id}** - bosses in 5 minutes! 🌍 *{timer.region}* 🔗 {link}",
+        priority=PRIORITY_WARNING,
+        mention="@here",
+        expires_at=timer.alert_time,  # no use once the bosses are up
+        due_at=timer.alert_time - WARNING_LEAD,
+        allowed_mentions={"parse": ["everyone"] if can_ping else []}
+    )
+
+async def execute_timer_warning(timer: TimerData, hop: int):
+    if timer not in active_timers:
+        return
+    raised_at = time.time()
+    late = scheduler.now() - (timer.alert_time - WARNING_LEAD)
+    hop_logger.info("[Timer #%s] Hop %s/%s warning fired %.3fs late", timer.id, hop+1, timer.hops, late,
+                    extra=_log_context(timer))
+    timer.event = scheduler.schedule(timer.alert_time, execute_timer, timer, hop)
+    prepared_hop, alert = _prepared_warnings.pop(timer.id, (None, None))
+    if late >= WARNING_LEAD:
+        return  # e.g. resumed after a suspend: the bosses are already up
+    if timer.channel_id:
+        if prepared_hop != hop:
+            alert = _warning_alert(timer, resolve_channel(timer.channel_id, timer.guild_id))
+        alert.raised_at = raised_at
+        key = f"warning:{timer.id}:{timer.start_time:.3f}:{hop}"
+        payload = alert.as_dict()
+        alert.ref = await outbox.transact(
+            lambda box: box.add_alert(timer.channel_id, timer.guild_id, payload) if box.claim([key]) else None)
+        if alert.ref is None:
+            hop_logger.info("[Timer #%s] Hop %s/%s warning already sent before restart", timer.id, hop+1,
+                            timer.hops, extra=_log_context(timer))
+            return
+        send_alert(timer.channel_id, alert, timer.guild_id)
+
+async def execute_timer(timer: TimerData, hop: int):
+    if timer not in active_timers:
+        return
+    timer.lateness = scheduler.now() - timer.alert_time
+    hop_logger.info("[Timer #%s] Hop %s/%s expired %.3fs late", timer.id, hop+1, timer.hops, timer.lateness,
+                    extra=_log_context(timer))
+    if hop + 1 < timer.hops:
+        _schedule_hop(timer, hop + 1)
+        return
+
+    logger.info("[Timer #%s] Completed all hops.", timer.id, extra=_log_context(timer))
+    active_timers.remove(timer)
+    _prepared_warnings.pop(timer.id, None)
+    store.timer_finished(timer.id)
+    logger.info("[Timer #%s] Cleaned up.", timer.id, extra=_log_context(timer))
+
+def cancel_timer(timer: TimerData):
+    scheduler.cancel(timer.event)
+    _prepared_warnings.pop(timer.id, None)
+    active_timers.remove(timer)
+    store.timer_cancelled(timer.id)
+    logger.info("[Timer #%s] Cancelled.", timer.id, extra=_log_context(timer))
+
+# ------------------------------------------------------
+# Prefetching
+# ------------------------------------------------------
+# channels discord.py does not cache (fetched over REST): id -> (fetched at, channel), oldest first.
+# They only have to outlive the alert they were fetched for, so entries expire after FETCHED_CHANNEL_TTL.
+_fetched_channels: "OrderedDict[int, Tuple[float, Any]]" = OrderedDict()
+FETCHED_CHANNEL_TTL = max(60.0, 2 * PREFETCH_LEAD)
+_prepared_warnings: Dict[int, Tuple[int, Alert]] = {}  # timer id -> (hop, warning ready to go)
+
+def _fetched_channel(channel_id: int):
+    entry = _fetched_channels.get(channel_id)
+    if entry is None:
+        return None
+    if time.monotonic() - entry[0] > FETCHED_CHANNEL_TTL:
+        del _fetched_channels[channel_id]
+        return None
+    return entry[1]
+
+def _remember_channel(channel_id: int, channel):
+    now = time.monotonic()
+    _fetched_channels[channel_id] = (now, channel)
+    _fetched_channels.move_to_end(channel_id)
+    while _fetched_channels:
+        oldest = next(iter(_fetched_channels.values()))
+        if now - oldest[0] <= FETCHED_CHANNEL_TTL:
+            break
+        _fetched_channels.popitem(last=False)
+
+def resolve_channel(channel_id: int, guild_id: Optional[int] = None):
+    """Cached channel if we have it, otherwise a partial one that can still send."""
+    return (bot.get_channel(channel_id) or _fetched_channel(channel_id)
+            or bot.get_partial_messageable(channel_id, guild_id=guild_id))
+
+async def prefetch_channel(channel_id: int):
+    """Make sure `resolve_channel` has the full channel at the deadline, fetching it if need be."""
+    channel = bot.get_channel(channel_id) or _fetched_channel(channel_id)
+    if channel is None:
+        try:
+            channel = await bot.fetch_channel(channel_id)
+            _remember_channel(channel_id, channel)
+        except discord.DiscordException as exc:
+            logger.warning("Could not fetch channel %s ahead of an alert: %s", channel_id, exc)
+            return resolve_channel(channel_id)
+    return channel
+
+def _channel_permissions(channel) -> Tuple[bool, bool]:
+    """(may send, may ping @here) for the bot; partial channels are assumed to allow both."""
+    guild = getattr(channel, "guild", None)
+    if guild is None or not hasattr(channel, "permissions_for"):
+        return True, True
+    permissions = channel.permissions_for(guild.me)
+    can_send = permissions.send_messages_in_threads if isinstance(channel, discord.Thread) else permissions.send_messages
+    return can_send, permissions.mention_everyone
+
+def _allowed_mentions(data: Optional[Dict[str, Any]]) -> Optional[discord.AllowedMentions]:
+    if data is None:
+        return None
+    users = [discord.Object(int(user_id)) for user_id in data.get("users", ())]
+    return discord.AllowedMentions(everyone="everyone" in data.get("parse", ()), users=users or False, roles=False)
+
+# ------------------------------------------------------
+# Delivery
+# ------------------------------------------------------
 
-async def safe_send(channel, message: str):
+def send_alert(channel_id: int, alert: Alert, guild_id: Optional[int] = None):
+    """
+    Hand `alert`, already recorded in the outbox, to the coalescer; it reaches the
+    dispatcher with the rest of its window.
+    """
+    alerts.add(channel_id, alert, guild_id)
+
+async def _deliver(message: OutboundMessage):
+    if webhooks.handles(message.channel_id) and await webhooks.send(
+            message.channel_id, message.content, message.allowed_mentions):
+        return
+    await resolve_channel(message.channel_id, message.guild_id).send(
+        message.content, nonce=message.nonce, allowed_mentions=_allowed_mentions(message.allowed_mentions))
+
+def _delivery_done(message: OutboundMessage, delivered: bool):
+    # acknowledged or dead-lettered: either way the outbox owes nothing more
+    if message.ref is not None:
+        outbox.remove(message.ref)
+
+def _is_transient(exc: Exception) -> bool:
+    """Server errors, rate limits and connection trouble are worth another try; 4xx are not."""
+    if isinstance(exc, (discord.HTTPException, WebhookError)):
+        return exc.status >= 500 or exc.status == 429
+    return isinstance(exc, (discord.ConnectionClosed, aiohttp.ClientError, asyncio.TimeoutError, OSError))
+
+async def redeliver_dead_letters():
+    """Give alerts that failed before the last shutdown another chance, unless they are stale by now."""
+    now = time.time()
+    for entry in dead_letters.drain():
+        if entry["expires_at"] <= now:
+            logger.info("Dropping stale dead letter for channel %s (%s)", entry['channel_id'], entry['reason'])
+            continue
+        mentions = entry.get("allowed_mentions")
+        [(ref, nonce)] = await outbox.add_messages(entry["channel_id"], entry["guild_id"], [entry["content"]],
+                                                   entry["priority"], entry["expires_at"], (), entry.get("nonce"),
+                                                   [mentions])
+        dispatcher.enqueue(entry["channel_id"], entry["content"], entry["priority"],
+                           entry["guild_id"], entry["expires_at"], ref, nonce, allowed_mentions=mentions)
+
+def resume_outbox():
+    """Queue everything that was owed when the bot last stopped, ahead of any new alert."""
+    pending_alerts, pending_messages = outbox.open()
+    for row in pending_messages:
+        dispatcher.enqueue(row["channel_id"], row["content"], row["priority"], row["guild_id"],
+                           row["expires_at"], row["id"], row["nonce"], allowed_mentions=row["allowed_mentions"])
+    for row in pending_alerts:
+        alert = Alert.from_dict(row["payload"])
+        alert.ref = row["id"]
+        send_alert(row["channel_id"], alert, row["guild_id"])
+
+outbox = Outbox(OUTBOX_DB)
+webhooks = WebhookSender(DISCORD_TOKEN, WEBHOOK_CHANNELS, DISCORD_API_BASE)
+dead_letters = DeadLetterQueue(DEAD_LETTER_PATH)
+dispatcher = Dispatcher(_deliver, workers=SEND_WORKERS, retryable=_is_transient, dead_letters=dead_letters,
+                        on_done=_delivery_done, max_lead=ALERT_MAX_LEAD)
+alerts = Coalescer(dispatcher, ALERT_COALESCE_WINDOW, outbox=outbox)
+
+# ------------------------------------------------------
+# Cached responses
+# ------------------------------------------------------
+responses = ResponseCache(enabled=TIMESTAMP_STYLE == "discord", max_entries=RESPONSE_CACHE_SIZE)
+active_timers.subscribe(lambda change, timer: responses.invalidate(("timers", timer.guild_id)))
+active_reminders.subscribe(lambda change, reminder: responses.invalidate(("reminders", reminder.user_id)))
+
+def timer_line(t: TimerData) -> str:
+    return f"**#{t.id}** — Region: **{t.region}**, Hops left: **{t.remaining_hops}**, Next: {format_due(t.alert_time)}"
+
+# Lines only stay valid between changes when the client renders the countdown.
+timer_view = TimerView(timer_line, prerender=TIMESTAMP_STYLE == "discord")
+active_timers.subscribe(timer_view.on_change)
+
+def render_timers(guild_id: Optional[int], limit: Optional[int] = None, **filters) -> str:
+    """The guild's timers, next alert first, cut to what fits in one message."""
+    total = timer_view.count(guild_id, **filters)
+    if limit is not None:
+        total = min(total, limit)
+    if not total:
+        return "📭 No active timers."
+    return fit_lines("**🕒 Active Timers:**", timer_view.lines(limit, guild_id, **filters), total)
+
+def render_reminders(user_id: int) -> str:
+    """The user's reminders, soonest first, cut to what fits in one message."""
+    reminders = active_reminders.for_user(user_id)
+    if not reminders:
+        return "📭 You have no active reminders."
+    lines = (f"• **{rem.keyword}** (#{rem.id}) — triggers {format_due(rem.group.deadline)}" for rem in reminders)
+    return fit_lines("**🔔 Your Active Reminders:**", lines, len(reminders))
+
+# ------------------------------------------------------
+# Boards
+# ------------------------------------------------------
+def render_board(channel_id: int) -> str:
+    """The channel's timers, next alert first; Discord timestamps keep the countdown live between edits."""
+    header = "**🕒 Timer Board**"
+    total = timer_view.count(channel_id=channel_id)
+    if not total:
+        return f"{header}\n📭 No active timers in this channel."
+    lines = (
+        f"**#{t.id}** — **{t.region}** — <t:{int(t.alert_time)}:R> (<t:{int(t.alert_time)}:T>), "
+        f"hops left **{t.remaining_hops}**" + (f" — <{t.link}>" if t.link else "")
+        for t in timer_view.top(channel_id=channel_id)
+    )
+    return fit_lines(header, lines, total)
+
+async def publish_board(channel_id: int, message_id: Optional[int], content: str) -> int:
+    channel = resolve_channel(channel_id)
+    if message_id is not None:
+        try:
+            await channel.get_partial_message(message_id).edit(content=content)
+            return message_id
+        except discord.NotFound:
+            pass  # someone deleted the board; post a new one
+    message = await channel.send(content, allowed_mentions=discord.AllowedMentions.none())
+    return message.id
+
+_board_deletes = set()  # strong references to pending deletes, which asyncio itself does not keep
+
+async def _delete_board_message(channel_id: int, message_id: int):
     try:
-        if hasattr(channel, "send"):
-            await channel.send(message)
-    except discord.DiscordException as exc:
-        logger.warning(f"Failed to send message: {exc}")
+        await resolve_channel(channel_id).get_partial_message(message_id).delete()
+    except discord.HTTPException as exc:
+        logger.warning("Could not delete board message %s: %s", message_id, exc)
+
+boards = BoardManager(publish_board, render_board, _delete_board_message, BOARD_PATH, BOARD_INTERVAL)
+active_timers.subscribe(lambda change, timer: boards.touch(timer.channel_id))
 
 # ------------------------------------------------------
 # Reminder Logic
 # ------------------------------------------------------
-async def _run_reminder(reminder: ReminderData, channel, user):
-    try:
-        await asyncio.sleep(reminder.duration)
-        if channel and hasattr(channel, "send"):
-            try:
-                await channel.send(f"🔔 {user.mention} — Reminder: **{reminder.keyword}**")
-            except discord.DiscordException as exc:
-                logger.warning(f"Failed to send reminder to channel: {exc}")
-    except asyncio.CancelledError:
-        logger.info(f"Reminder for {reminder.keyword} cancelled for user {getattr(user, 'id', 'unknown')}")
-        raise
-    finally:
-        uid = getattr(user, "id", None)
-        if uid is not None:
-            lst = active_reminders.get(uid)
-            if lst and reminder in lst:
-                lst.remove(reminder)
-                if not lst:
-                    active_reminders.pop(uid, None)
-
-def schedule_reminder(keyword: str, duration: int, channel, user) -> ReminderData:
-    reminder = ReminderData(keyword=keyword, start_time=datetime.now(timezone.utc), duration=duration)
-    task = asyncio.create_task(_run_reminder(reminder, channel, user))
-    reminder.task = task
-    uid = getattr(user, "id", None)
-    if uid is not None:
-        active_reminders.setdefault(uid, []).append(reminder)
+async def prefetch_reminder_group(group: ReminderGroup):
+    """Warm the channel ahead of the deadline; the message itself waits, since members may still change."""
+    if not group.members:
+        return
+    _arm_reminder_group(group)
+    if group.channel_id:
+        can_send, _ = _channel_permissions(await prefetch_channel(group.channel_id))
+        if not can_send:
+            logger.warning("Missing permission to send reminders in channel %s", group.channel_id)
+
+async def _run_reminder_group(group: ReminderGroup):
+    raised_at = time.time()
+    reminders = list(group.members.values())
+    keys = {_reminder_key(reminder): reminder.user_id for reminder in reminders}
+
+    def record(box: Outbox) -> Optional[Alert]:
+        # reminders whose alert went out before a restart are only cleaned up
+        due = list(dict.fromkeys(keys[key] for key in box.claim(list(keys))))
+        if not due or not group.channel_id:
+            return None
+        users = [f"<@{user_id}>" for user_id in due]
+        alert = Alert(
+            # one subscriber keeps the usual text; more are listed after the keyword
+            text=f"🔔 {users[0]} — Reminder: **{group.keyword}**" if len(users) == 1 else None,
+            line=f"🔔 Reminder: **{group.keyword}**",
+            priority=PRIORITY_REMINDER,
+            group=f"reminder:{group.keyword}",
+            members=users,
+            due_at=group.deadline,
+            allowed_mentions={"parse": [], "users": [str(user_id) for user_id in due]}
+        )
+        alert.ref = box.add_alert(group.channel_id, None, alert.as_dict())
+        return alert
+
+    alert = await outbox.transact(record)
+    if alert is not None:
+        alert.raised_at = raised_at
+        send_alert(group.channel_id, alert)
+    for reminder in reminders:
+        if active_reminders.remove(reminder):
+            store.reminder_fired(reminder.id)
+
+def _reminder_key(reminder: ReminderData) -> str:
+    return f"reminder:{reminder.id}:{reminder.start_time:.3f}"
+
+def schedule_reminder(keyword: str, duration: int, channel_id: Optional[int], user_id: int) -> ReminderData:
+    global _reminder_id_counter
+    reminder = ReminderData(
+        id=_reminder_id_counter,
+        user_id=user_id,
+        channel_id=channel_id,
+        keyword=keyword,
+        start_time=scheduler.now(),
+        duration=duration
+    )
+    _reminder_id_counter += 1
+    _arm_reminder(reminder)
+    store.reminder_created(reminder)
     return reminder
 
+def _arm_reminder(reminder: ReminderData):
+    """Register `reminder`; only the first member of a group puts an entry on the scheduler."""
+    group = active_reminders.add(reminder)
+    if group.event is None:
+        if group.deadline - PREFETCH_LEAD > scheduler.now() and PREFETCH_LEAD > 0:
+            group.event = scheduler.schedule(group.deadline - PREFETCH_LEAD, prefetch_reminder_group, group)
+        else:
+            _arm_reminder_group(group)
+
+def _arm_reminder_group(group: ReminderGroup):
+    lead = dispatcher.expected_delay(group.channel_id)
+    group.event = scheduler.schedule(group.deadline - lead, _run_reminder_group, group)
+
+def cancel_reminder(reminder: ReminderData, uid: int):
+    # the group still fires for everyone else; drop its entry once nobody is left
+    if active_reminders.remove(reminder) and not reminder.group.members:
+        scheduler.cancel(reminder.group.event)
+    store.reminder_cancelled(reminder.id)
+    logger.info("Reminder for %s cancelled for user %s", reminder.keyword, uid, extra={"user_id": uid})
+
+# ------------------------------------------------------
+# Persistence
+# ------------------------------------------------------
+def restore_state():
+    """Reload stored timers and reminders and put them back on the scheduler."""
+    global _timer_id_counter, _reminder_id_counter
+    timer_rows, reminder_rows = store.open()
+
+    for row in timer_rows:
+        timer = TimerData(**row)
+        active_timers.add(timer)
+        _arm_timer(timer, timer.hops - timer.remaining_hops)
+        _timer_id_counter = max(_timer_id_counter, timer.id + 1)
+
+    for row in reminder_rows:
+        reminder = ReminderData(**row)
+        _arm_reminder(reminder)
+        _reminder_id_counter = max(_reminder_id_counter, reminder.id + 1)
+
+# ------------------------------------------------------
+# Metrics
+# ------------------------------------------------------
+LOOP_LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+metrics = MetricsRegistry("boss_")
+metrics.gauge("timers_active", "Active timers.", lambda: len(active_timers))
+metrics.gauge("reminders_active", "Active reminders.", lambda: len(active_reminders))
+metrics.gauge("scheduler_pending", "Timer and reminder events waiting on the scheduler.", lambda: len(scheduler))
+metrics.gauge("outbound_queue_depth", "Messages waiting in the dispatcher.", lambda: dispatcher.depth)
+metrics.counter("alerts_sent", "Messages Discord acknowledged.", fn=lambda: dispatcher.sent)
+metrics.counter("send_failures", "Failed send attempts, retried or not.", fn=lambda: dispatcher.failed)
+metrics.counter("alerts_expired", "Messages dropped because they went stale.", fn=lambda: dispatcher.expired)
+metrics.counter("alerts_dead_lettered", "Messages given up on and written to the dead-letter file.",
+                fn=lambda: dispatcher.dead)
+metrics.histogram("alert_lateness_seconds", "Acknowledgement time minus the alert's due time.",
+                  dispatcher.delivery_error)
+metrics.gauge("gateway_latency_seconds", "Heartbeat latency of the Discord gateway.", lambda: bot.latency)
+loop_monitor = LoopMonitor(LOOP_SENTINEL_INTERVAL, LOOP_SLOW_THRESHOLD, histogram=metrics.histogram(
+    "event_loop_lag_seconds", "How late the loop monitor's sentinel woke up.", LOOP_LAG_BUCKETS))
+# Every command reports bad input with a "❌ …" response.
+command_metrics = CommandMetrics(metrics, is_rejection=lambda content: content.startswith("❌"))
+# The checkpoint runs on the watchdog thread: closing the store drains its write queue to disk.
+watchdog = Watchdog(WATCHDOG_PATH, WATCHDOG_TIMEOUT, restart=WATCHDOG_RESTART, checkpoint=store.close)
+
+def register_command_metrics():
+    """Create every command's series before the first interaction arrives."""
+    for command in bot.tree.walk_commands():
+        command_metrics.register(command.qualified_name)
+
+def render_command_stats() -> str:
+    lines = []
+    for name, entry in command_metrics.stats().items():
+        if not entry["count"]:
+            continue
+        outcomes, latency, size = entry["outcomes"], entry["latency_seconds"], entry["response_chars"]
+        lines.append(f"**/{name}** — {entry['count']} calls (ok {outcomes['ok']}, rejected {outcomes['validation']}, "
+                     f"failed {outcomes['exception']}), p50 ≤{latency['p50']:g}s, p95 ≤{latency['p95']:g}s, "
+                     f"avg {size['avg']} chars")
+    lag = loop_monitor.percentiles()
+    header = (f"**📈 Bot stats** — timers **{len(active_timers)}**, reminders **{len(active_reminders)}**, "
+              f"outbound queue **{dispatcher.depth}**, loop lag p99 **{lag['p99'] * 1000:.0f} ms**")
+    return fit_lines(header, lines or ["No commands handled yet."], len(lines) or 1)
+
 # ------------------------------------------------------
 # Keepalive Web Server (for UptimeRobot)
 # ------------------------------------------------------
 async def handle_root(request):
     return web.Response(text="✅ Bot is alive!", content_type="text/plain")
 
+def _diagnostics_allowed(request) -> bool:
+    """Stall stacks and per-command numbers are not for the public keepalive port: token or localhost only."""
+    if DIAGNOSTICS_TOKEN:
+        return hmac.compare_digest(request.headers.get("Authorization", ""), f"Bearer {DIAGNOSTICS_TOKEN}")
+    return request.remote in ("127.0.0.1", "::1")
+
+async def handle_stats(request):
+    stats = {
+        "timers": len(active_timers),
+        "reminders": len(active_reminders),
+        "reminder_groups": active_reminders.groups,
+        "scheduled": len(scheduler),
+        "alerts": {"coalesced": alerts.alerts, "messages": alerts.messages},
+        "outbound": dispatcher.stats(),
+        "webhooks": webhooks.stats(),
+        "boards": boards.stats(),
+        "responses": responses.stats(),
+        "loop_lag_seconds": loop_monitor.percentiles(),
+        "watchdog": watchdog.stats(),
+        "hop_logs_dropped": hop_sampler.dropped,
+    }
+    if _diagnostics_allowed(request):
+        stats["commands"] = command_metrics.stats()
+    return web.json_response(stats)
+
+async def handle_loop(request):
+    if not _diagnostics_allowed(request):
+        return web.Response(status=403, text="Forbidden", content_type="text/plain")
+    return web.json_response(loop_monitor.stats())
+
+async def handle_metrics(request):
+    return web.Response(body=metrics.render().encode(), headers={"Content-Type": CONTENT_TYPE})
+
 async def run_keepalive():
     app = web.Application()
     app.router.add_get("/", handle_root)
+    app.router.add_get("/stats", handle_stats)
+    app.router.add_get("/metrics", handle_metrics)
+    app.router.add_get("/loop", handle_loop)
     runner = web.AppRunner(app)
     await runner.setup()
     site = web.TCPSite(runner, "0.0.0.0", PORT)
     await site.start()
-    logger.info(f"🌐 Keepalive server running on port {PORT}")
+    logger.info("🌐 Keepalive server running on port %s", PORT)
     # don't block here; site will keep serving in the event loop
 
 # ------------------------------------------------------
@@ -192,19 +642,20 @@ async def run_keepalive():
 # ------------------------------------------------------
 @bot.event
 async def on_ready():
-    logger.info(f"✅ Logged in as {bot.user} (id: {bot.user.id})")
+    logger.info("✅ Logged in as %s (id: %s)", bot.user, bot.user.id)
     try:
         if GUILD_OBJECT:
             synced = await bot.tree.sync(guild=GUILD_OBJECT)
-            logger.info(f"Synced {len(synced)} commands to guild {GUILD_OBJECT.id}")
+            logger.info("Synced %s commands to guild %s", len(synced), GUILD_OBJECT.id)
         else:
             synced = await bot.tree.sync()
-            logger.info(f"Synced {len(synced)} global commands")
+            logger.info("Synced %s global commands", len(synced))
     except Exception as exc:
-        logger.exception(f"Command sync failed: {exc}")
+        logger.exception("Command sync failed: %s", exc)
 
 @bot.tree.command(name="timer", description="Start a repeating timer with hops.")
 @app_commands.describe(time="Initial time (e.g. 1h30m)", hops="Number of hops (default 1)", region="Region name", link="Invite link to the server")
+@command_metrics.instrument
 async def timer_command(interaction: Interaction, time: str, hops: int = 1, region: str = "Unknown", link: str = ""):
     global _timer_id_counter
     try:
@@ -217,8 +668,14 @@ async def timer_command(interaction: Interaction, time: str, hops: int = 1, regi
         # noinspection PyUnresolvedReferences
         return await interaction.response.send_message("❌ Hops must be at least 1.", ephemeral=True)
 
+    if len(region) > REGION_MAX_LENGTH or len(link or "") > LINK_MAX_LENGTH:
+        # noinspection PyUnresolvedReferences
+        return await interaction.response.send_message(
+            f"❌ Region may be at most {REGION_MAX_LENGTH} characters and link at most {LINK_MAX_LENGTH}.",
+            ephemeral=True)
+
     link = (link or "").strip()
-    if link and any(t.link == link for t in active_timers):
+    if link and active_timers.by_link(link):
         # noinspection PyUnresolvedReferences
         return await interaction.response.send_message("❌ A timer with that link already exists.", ephemeral=True)
 
@@ -226,21 +683,21 @@ async def timer_command(interaction: Interaction, time: str, hops: int = 1, regi
         timer_id = _timer_id_counter
         _timer_id_counter += 1
 
-    now = datetime.now(timezone.utc)
     timer = TimerData(
         id=timer_id,
-        user=interaction.user,
-        channel=interaction.channel,
+        user_id=interaction.user.id,
+        channel_id=interaction.channel_id,
+        guild_id=interaction.guild_id,
         initial_duration=seconds,
         region=region,
         link=link,
         hops=hops,
         remaining_hops=hops,
-        start_time=now,
-        alert_time=now + timedelta(seconds=seconds)
+        start_time=scheduler.now()
     )
-    timer.task = asyncio.create_task(execute_timer(timer))
-    active_timers.append(timer)
+    active_timers.add(timer)
+    start_timer(timer)
+    store.timer_created(timer)
 
     # noinspection PyUnresolvedReferences
     return await interaction.response.send_message(
@@ -248,37 +705,71 @@ async def timer_command(interaction: Interaction, time: str, hops: int = 1, regi
         ephemeral=True
     )
 
-@bot.tree.command(name="timers", description="List all active timers.")
-async def timers_command(interaction: Interaction):
-    if not active_timers:
+@bot.tree.command(name="timers", description="List active timers, next alert first.")
+@app_commands.describe(region="Only timers in this region", channel="Only timers started in this channel",
+                       owner="Only timers started by this member", limit="Show at most this many")
+@command_metrics.instrument
+async def timers_command(interaction: Interaction, region: Optional[str] = None,
+                         channel: Optional[discord.abc.GuildChannel] = None,
+                         owner: Optional[discord.User] = None, limit: Optional[int] = None):
+    guild_id = interaction.guild_id
+    if limit is not None and limit < 1:
         # noinspection PyUnresolvedReferences
-        return await interaction.response.send_message("📭 No active timers.", ephemeral=True)
-
-    lines = ["**🕒 Active Timers:**\n"]
-    now = datetime.now(timezone.utc)
-    for t in active_timers:
-        remaining = max(0, int((t.alert_time - now).total_seconds())) if t.alert_time else 0
-        display = humanize_seconds(remaining)
-        lines.append(f"**#{t.id}** — Region: **{t.region}**, Hops left: **{t.remaining_hops}**, Next: **{display}**\n")
-
+        return await interaction.response.send_message("❌ Limit must be at least 1.", ephemeral=True)
+    filters = {
+        "region": region.strip() if region else None,
+        "channel_id": channel.id if channel else None,
+        "user_id": owner.id if owner else None,
+    }
+    if limit is None and not any(filters.values()):
+        content = responses.get(("timers", guild_id), lambda: render_timers(guild_id))
+    else:
+        content = render_timers(guild_id, limit, **filters)
     # noinspection PyUnresolvedReferences
-    return await interaction.response.send_message("".join(lines), ephemeral=True)
+    return await interaction.response.send_message(content, ephemeral=True)
 
 @bot.tree.command(name="remove", description="Remove a timer by its number.")
+@command_metrics.instrument
 async def remove_command(interaction: Interaction, timer_number: int):
-    for t in list(active_timers):
-        if t.id == timer_number:
-            if t.task and not t.task.done():
-                t.task.cancel()
-            if t in active_timers:
-                active_timers.remove(t)
-            # noinspection PyUnresolvedReferences
-            return await interaction.response.send_message(f"🛑 Timer #{timer_number} deleted.", ephemeral=True)
+    t = active_timers.get(timer_number)
+    if t is not None:
+        cancel_timer(t)
+        # noinspection PyUnresolvedReferences
+        return await interaction.response.send_message(f"🛑 Timer #{timer_number} deleted.", ephemeral=True)
 
     # noinspection PyUnresolvedReferences
     return await interaction.response.send_message("❌ No timer found with that number.", ephemeral=True)
 
+@bot.tree.command(name="board", description="Keep one live message in this channel listing its timers.")
+@app_commands.describe(action="'on' to create the board, 'off' to remove it")
+@app_commands.default_permissions(manage_messages=True)
+@command_metrics.instrument
+async def board_command(interaction: Interaction, action: str = "on"):
+    action = action.strip().lower()
+    channel_id = interaction.channel_id
+    if action == "on":
+        if not boards.enable(channel_id):
+            # noinspection PyUnresolvedReferences
+            return await interaction.response.send_message("ℹ️ This channel already has a timer board.", ephemeral=True)
+        # noinspection PyUnresolvedReferences
+        return await interaction.response.send_message("📋 Timer board enabled; it will appear shortly.", ephemeral=True)
+
+    if action == "off":
+        message_id = boards.disable(channel_id)
+        # noinspection PyUnresolvedReferences
+        response = await interaction.response.send_message("🗑 Timer board removed.", ephemeral=True)
+        if message_id is not None:
+            # after the reply, so the command's latency is not the delete's
+            task = asyncio.create_task(_delete_board_message(channel_id, message_id), name="board-delete")
+            _board_deletes.add(task)
+            task.add_done_callback(_board_deletes.discard)
+        return response
+
+    # noinspection PyUnresolvedReferences
+    return await interaction.response.send_message("❌ Usage: `/board on` or `/board off`", ephemeral=True)
+
 @bot.tree.command(name="reminder", description="Set a reminder for boss, raids, or super. Usage: <keyword> [time], e.g. 'boss 30m'")
+@command_metrics.instrument
 async def reminder_command(interaction: Interaction, message: str):
     """
     Expected `message` formats:
@@ -318,7 +809,7 @@ async def reminder_command(interaction: Interaction, message: str):
             duration_seconds = 1 * 3600  # 1 hour for boss and super
 
     # Schedule the reminder
-    schedule_reminder(keyword, duration_seconds, interaction.channel, interaction.user)
+    schedule_reminder(keyword, duration_seconds, interaction.channel_id, interaction.user.id)
     human_time = humanize_seconds(duration_seconds)
     return await interaction.response.send_message(
         f"🔔 Reminder for **{keyword}** set for {human_time}.", ephemeral=True
@@ -336,57 +827,62 @@ async def reminder_command(interaction: Interaction, message: str):
             return await interaction.response.send_message(f"❌ {e}", ephemeral=True)
 
     # Schedule the reminder (no local unused variable)
-    schedule_reminder(keyword, duration_seconds, interaction.channel, interaction.user)
+    schedule_reminder(keyword, duration_seconds, interaction.channel_id, interaction.user.id)
     human_time = humanize_seconds(duration_seconds)
     # noinspection PyUnresolvedReferences
     return await interaction.response.send_message(f"🔔 Reminder for **{keyword}** set for {human_time}.", ephemeral=True)
 
 @bot.tree.command(name="reminders", description="List or cancel your active reminders.")
-@app_commands.describe(action="Optional: 'list' (default) or 'cancel <keyword>'")
+@app_commands.describe(action="Optional: 'list' (default) or 'cancel <keyword> [#id]'")
+@command_metrics.instrument
 async def reminders_command(interaction: Interaction, action: Optional[str] = "list"):
     """
     /reminders — shows your active reminders
-    /reminders cancel boss — cancels your reminder for 'boss'
+    /reminders cancel boss — cancels your oldest reminder for 'boss'
+    /reminders cancel boss 12 — cancels reminder #12 for 'boss'
     """
     uid = getattr(interaction.user, "id", None)
     if uid is None:
         # noinspection PyUnresolvedReferences
         return await interaction.response.send_message("❌ Unable to identify your user ID.", ephemeral=True)
 
-    user_reminders = active_reminders.get(uid, [])
     parts = (action or "").split()
 
     # Handle cancel request
     if parts and parts[0].lower() == "cancel":
         if len(parts) < 2:
             # noinspection PyUnresolvedReferences
-            return await interaction.response.send_message("❌ Usage: `/reminders cancel <keyword>`", ephemeral=True)
+            return await interaction.response.send_message("❌ Usage: `/reminders cancel <keyword> [#id]`", ephemeral=True)
         keyword = parts[1].lower()
-        for rem in list(user_reminders):
-            if rem.keyword == keyword:
-                if rem.task and not rem.task.done():
-                    rem.task.cancel()
-                user_reminders.remove(rem)
-                if not user_reminders:
-                    active_reminders.pop(uid, None)
+        reminder_id = None
+        if len(parts) > 2:
+            try:
+                reminder_id = int(parts[2].lstrip("#"))
+            except ValueError:
                 # noinspection PyUnresolvedReferences
-                return await interaction.response.send_message(f"🗑 Reminder for **{keyword}** cancelled.", ephemeral=True)
+                return await interaction.response.send_message("❌ Usage: `/reminders cancel <keyword> [#id]`", ephemeral=True)
+        rem = active_reminders.find(uid, keyword, reminder_id)
+        if rem is not None:
+            cancel_reminder(rem, uid)
+            # noinspection PyUnresolvedReferences
+            return await interaction.response.send_message(f"🗑 Reminder for **{keyword}** cancelled.", ephemeral=True)
         # noinspection PyUnresolvedReferences
         return await interaction.response.send_message(f"❌ No active reminder found for '{keyword}'.", ephemeral=True)
 
     # Default: list all reminders
-    if not user_reminders:
-        # noinspection PyUnresolvedReferences
-        return await interaction.response.send_message("📭 You have no active reminders.", ephemeral=True)
-
-    now = datetime.now(timezone.utc)
-    lines = ["**🔔 Your Active Reminders:**\n"]
-    for rem in user_reminders:
-        remaining = max(0, int((rem.start_time + timedelta(seconds=rem.duration) - now).total_seconds()))
-        lines.append(f"• **{rem.keyword}** — triggers in {humanize_seconds(remaining)}\n")
+    if active_reminders.has_user(uid):
+        content = responses.get(("reminders", uid), lambda: render_reminders(uid))
+    else:
+        content = render_reminders(uid)  # not cached: one entry per user who ever asked
+    # noinspection PyUnresolvedReferences
+    return await interaction.response.send_message(content, ephemeral=True)
 
+@bot.tree.command(name="stats", description="Command latency and outcomes since the bot started.")
+@app_commands.default_permissions(administrator=True)
+@command_metrics.instrument
+async def stats_command(interaction: Interaction):
     # noinspection PyUnresolvedReferences
-    return await interaction.response.send_message("".join(lines), ephemeral=True)
+    return await interaction.response.send_message(render_command_stats(), ephemeral=True)
 
 
 # ------------------------------------------------------
@@ -394,13 +890,32 @@ async def reminders_command(interaction: Interaction, action: Optional[str] = "l
 # ------------------------------------------------------
 async def main():
     # start keepalive first (returns once site started)
+    register_command_metrics()
     await run_keepalive()
+    loop_monitor.start()
+    if WATCHDOG_TIMEOUT > 0:
+        watchdog.start()
+    # finish what was owed before the last shutdown, then rebuild timers/reminders
+    # from disk before we start taking commands
+    resume_outbox()
+    await redeliver_dead_letters()
+    boards.load()
+    restore_state()
+    await webhooks.start()
+    dispatcher.start()
+    scheduler.start()
+    boards.start()
     # start the bot (this call blocks until the bot stops)
     try:
         await bot.start(DISCORD_TOKEN)
     finally:
         # ensure cleanup
         await bot.close()
+        loop_monitor.stop()
+        watchdog.stop()
+        await webhooks.close()
+        store.close()
+        outbox.close()
 
 if __name__ == "__main__":
     try:
@@ -0,0 +1,662 @@
+import asyncio
+import bisect
+import heapq
+import itertools
+import json
+import logging
+import os
+import random
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger("timer-bot")
+
+# Lower number = sent first.
+PRIORITY_WARNING = 0   # "bosses in 5 minutes"
+PRIORITY_REMINDER = 1
+PRIORITY_INFO = 2
+PRIORITY_NAMES = {PRIORITY_WARNING: "warning", PRIORITY_REMINDER: "reminder", PRIORITY_INFO: "info"}
+
+# Discord allows roughly 5 messages per 5s per channel and 50 requests/s per bot.
+CHANNEL_RATE = (5, 5.0)
+GLOBAL_RATE = (50, 1.0)
+MESSAGE_LIMIT = 2000
+MENTION_LIMIT = 100  # users one message's allowed_mentions may list
+
+# Failed sends are retried after a random delay in [0, min(cap, base * 2**attempt)].
+RETRY_BASE = 1.0
+RETRY_CAP = 60.0
+RETRY_ATTEMPTS = 6
+MAX_AGE = 600.0  # staleness for messages enqueued without an explicit expiry
+
+# Alerts are raised early by the recent raise-to-acknowledge delay of their channel.
+DELAY_ALPHA = 0.2  # EWMA weight of the newest sample
+MAX_LEAD = 10.0
+# Upper bounds (seconds) of the delivery error buckets: acknowledged minus due time.
+ERROR_BUCKETS = (-5.0, -2.0, -1.0, -0.5, -0.25, -0.1, 0.0, 0.1, 0.25, 0.5, 1.0, 2.0, 5.0, 10.0, 30.0)
+
+# ------------------------------------------------------
+# Building blocks
+# ------------------------------------------------------
+class TokenBucket:
+    __slots__ = ("capacity", "rate", "tokens", "updated")
+
+    def __init__(self, capacity: int, per: float, now: float):
+        self.capacity = capacity
+        self.rate = capacity / per
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Seconds until a token is available (0 if one is available now)."""
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def take(self):
+        self.tokens -= 1
+
+
+class Histogram:
+    """Counts per fixed bucket: bucket i holds values <= edges[i], the last one everything above."""
+
+    __slots__ = ("edges", "counts", "count", "sum")
+
+    def __init__(self, edges: Sequence[float]):
+        self.edges = tuple(edges)
+        self.counts = [0] * (len(self.edges) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.edges, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q: float) -> float:
+        """Upper edge of the bucket holding the q-quantile (the last edge when it lies beyond)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for edge, count in zip(self.edges, self.counts):
+            seen += count
+            if seen >= rank:
+                return edge
+        return self.edges[-1]
+
+    def as_dict(self) -> Dict[str, Any]:
+        labels = [f"<={edge:g}" for edge in self.edges] + [f">{self.edges[-1]:g}"]
+        return {
+            "count": self.count,
+            "avg": round(self.sum / self.count, 4) if self.count else 0.0,
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+class OutboundMessage:
+    __slots__ = ("channel_id", "guild_id", "content", "priority", "enqueued_at", "seq", "expires_at", "attempts",
+                 "ref", "nonce", "due_at", "raised_at", "allowed_mentions")
+
+    def __init__(self, channel_id: int, guild_id: Optional[int], content: str, priority: int,
+                 enqueued_at: float, seq: int, expires_at: float, ref: Optional[int] = None,
+                 nonce: Optional[str] = None, due_at: Optional[float] = None, raised_at: Optional[float] = None,
+                 allowed_mentions: Optional[Dict[str, Any]] = None):
+        self.channel_id = channel_id
+        self.guild_id = guild_id
+        self.content = content
+        self.priority = priority
+        self.enqueued_at = enqueued_at
+        self.seq = seq
+        self.expires_at = expires_at  # epoch seconds after which the message is not worth sending
+        self.attempts = 0
+        self.ref = ref      # outbox message id, if the message is tracked there
+        self.nonce = nonce  # lets Discord drop a repeat of a send whose reply was lost
+        self.due_at = due_at        # epoch time the message should land at
+        self.raised_at = raised_at  # epoch time its oldest alert was raised
+        self.allowed_mentions = allowed_mentions  # Discord API form; None leaves the default
+
+    def __lt__(self, other: "OutboundMessage") -> bool:
+        return (self.priority, self.seq) < (other.priority, other.seq)
+
+
+class _ChannelQueue:
+    __slots__ = ("pending", "bucket", "ticket", "ticket_priority", "busy", "waiting", "delay")
+
+    def __init__(self, bucket: TokenBucket):
+        self.pending: List[OutboundMessage] = []
+        self.bucket = bucket
+        self.ticket = -1           # id of the live entry in the ready queue, -1 if none
+        self.ticket_priority = 0
+        self.busy = False          # a worker is sending for this channel right now
+        self.waiting = False       # parked until the channel bucket refills
+        self.delay: Optional[float] = None  # EWMA of raise-to-acknowledge time
+
+
+class _WaitStats:
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, value: float):
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+
+    def as_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "avg": round(self.total / self.count, 4) if self.count else 0.0,
+            "max": round(self.max, 4),
+        }
+
+
+class DeadLetterQueue:
+    """
+    Messages the dispatcher gave up on, appended to a JSON-lines file.
+
+    Writes happen on the failure path only and are a single short append, so they
+    are done inline. `drain` hands back everything recorded so far and empties the file.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.added = 0
+
+    def put(self, message: OutboundMessage, reason: str):
+        entry = {
+            "channel_id": message.channel_id,
+            "guild_id": message.guild_id,
+            "content": message.content,
+            "priority": message.priority,
+            "expires_at": message.expires_at,
+            "attempts": message.attempts,
+            "nonce": message.nonce,
+            "allowed_mentions": message.allowed_mentions,
+            "reason": reason,
+            "failed_at": time.time(),
+        }
+        try:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            self.added += 1
+        except OSError as exc:
+            logger.error("Could not write dead letter to %s: %s", self.path, exc)
+
+    def drain(self) -> List[Dict[str, Any]]:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                lines = f.readlines()
+        except FileNotFoundError:
+            return []
+        entries = []
+        for line in lines:
+            try:
+                entries.append(json.loads(line))
+            except ValueError:
+                logger.warning("Skipping malformed dead letter: %s", line.strip()[:80])
+        os.remove(self.path)
+        return entries
+
+    def __len__(self) -> int:
+        try:
+            with open(self.path, encoding="utf-8") as f:
+                return sum(1 for _ in f)
+        except FileNotFoundError:
+            return 0
+
+
+# ------------------------------------------------------
+# Dispatcher
+# ------------------------------------------------------
+class Dispatcher:
+    """
+    Outbound message pipeline shared by every timer and reminder.
+
+    Each channel has its own priority queue and a token bucket mirroring Discord's
+    per-channel limit; a global bucket caps the whole bot. Channels with something
+    to send wait in a ready queue ordered by their most urgent message, and a fixed
+    pool of workers drains it. A channel is only ever served by one worker at a
+    time, so its messages keep their order within a priority.
+
+    A send that fails with an error `retryable` accepts is put back on its channel
+    after a jittered exponential backoff; the wait is a loop timer, not a task, and
+    every attempt still spends a token, so a failing channel cannot flood the API.
+    Messages past their `expires_at`, out of attempts or failing for good go to the
+    dead-letter queue instead. `on_done(message, delivered)` is called once per
+    message when it has either been acknowledged or been given up on.
+
+    For messages that say when they were raised, the time from raising to Discord's
+    acknowledgement (coalescing, queueing and the request itself) is tracked per
+    channel as an EWMA; `expected_delay` lets callers raise alerts that much early.
+    Messages with a `due_at` record how far off their target they landed.
+    """
+
+    def __init__(self, send: Callable[[OutboundMessage], Awaitable[Any]], workers: int = 4,
+                 channel_rate=CHANNEL_RATE, global_rate=GLOBAL_RATE,
+                 clock: Callable[[], float] = time.monotonic,
+                 wall_clock: Callable[[], float] = time.time,
+                 retryable: Callable[[Exception], bool] = lambda exc: True,
+                 dead_letters: Optional[DeadLetterQueue] = None,
+                 on_done: Optional[Callable[[OutboundMessage, bool], Any]] = None,
+                 retry_attempts: int = RETRY_ATTEMPTS, retry_base: float = RETRY_BASE,
+                 retry_cap: float = RETRY_CAP, max_age: float = MAX_AGE, max_lead: float = MAX_LEAD):
+        self._send = send
+        self.workers = workers
+        self.channel_rate = channel_rate
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.retryable = retryable
+        self.dead_letters = dead_letters
+        self.on_done = on_done
+        self.retry_attempts = retry_attempts
+        self.retry_base = retry_base
+        self.retry_cap = retry_cap
+        self.max_age = max_age
+        self.max_lead = max_lead
+        self._global = TokenBucket(global_rate[0], global_rate[1], clock())
+        self._channels: Dict[int, _ChannelQueue] = {}
+        self._ready: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        self._seq = itertools.count()
+        self._tasks: Set[asyncio.Task] = set()
+        self._depth = {priority: 0 for priority in PRIORITY_NAMES}
+        self._waits = {priority: _WaitStats() for priority in PRIORITY_NAMES}
+        self._latency = _WaitStats()
+        self._raise_to_send = _WaitStats()
+        self._delay: Optional[float] = None  # EWMA over all channels, for channels without samples
+        self.delivery_error = Histogram(ERROR_BUCKETS)
+        self.sent = 0
+        self.failed = 0
+        self.retried = 0
+        self.expired = 0
+        self.dead = 0
+        self._retrying = 0
+
+    def start(self):
+        while len(self._tasks) < self.workers:
+            task = asyncio.create_task(self._worker(), name=f"dispatcher-{len(self._tasks)}")
+            self._tasks.add(task)
+
+    def enqueue(self, channel_id: int, content: str, priority: int = PRIORITY_INFO,
+                guild_id: Optional[int] = None, expires_at: Optional[float] = None,
+                ref: Optional[int] = None, nonce: Optional[str] = None,
+                due_at: Optional[float] = None, raised_at: Optional[float] = None,
+                allowed_mentions: Optional[Dict[str, Any]] = None) -> OutboundMessage:
+        if expires_at is None:
+            expires_at = self.wall_clock() + self.max_age
+        message = OutboundMessage(channel_id, guild_id, content, priority, self.clock(), next(self._seq), expires_at,
+                                  ref, nonce, due_at, raised_at, allowed_mentions)
+        self._push(message)
+        return message
+
+    def expected_delay(self, channel_id: Optional[int]) -> float:
+        """How early to raise an alert for `channel_id` so it lands on time, capped at `max_lead`."""
+        queue = self._channels.get(channel_id)
+        delay = queue.delay if queue is not None and queue.delay is not None else self._delay
+        return min(max(delay or 0.0, 0.0), self.max_lead)
+
+    @property
+    def depth(self) -> int:
+        return sum(self._depth.values())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "depth": self.depth,
+            "depth_by_priority": {PRIORITY_NAMES[p]: n for p, n in self._depth.items()},
+            "wait_seconds": {PRIORITY_NAMES[p]: w.as_dict() for p, w in self._waits.items()},
+            "send_seconds": self._latency.as_dict(),
+            "raise_to_send_seconds": self._raise_to_send.as_dict(),
+            "expected_delay": round(self._delay or 0.0, 4),
+            "delivery_error_seconds": self.delivery_error.as_dict(),
+            "channels": len(self._channels),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retrying": self._retrying,
+            "retried": self.retried,
+            "expired": self.expired,
+            "dead_lettered": self.dead,
+        }
+
+    # --------------------------------------------------
+    # Internals
+    # --------------------------------------------------
+    def _push(self, message: OutboundMessage):
+        queue = self._channels.get(message.channel_id)
+        if queue is None:
+            queue = self._channels[message.channel_id] = _ChannelQueue(TokenBucket(*self.channel_rate, self.clock()))
+        heapq.heappush(queue.pending, message)
+        self._depth[message.priority] += 1
+        self._mark_ready(message.channel_id, queue)
+
+    def _retry(self, message: OutboundMessage):
+        self._retrying -= 1
+        self._push(message)
+
+    def _give_up(self, message: OutboundMessage, reason: str):
+        self.dead += 1
+        logger.warning("Giving up on message for channel %s after %s attempt(s): %s",
+                       message.channel_id, message.attempts, reason)
+        if self.dead_letters is not None:
+            self.dead_letters.put(message, reason)
+        self._done(message, False)
+
+    def _delivered(self, message: OutboundMessage, queue: _ChannelQueue):
+        now = self.wall_clock()
+        if message.due_at is not None:
+            self.delivery_error.observe(now - message.due_at)
+        if message.raised_at is not None and message.attempts == 0:
+            # retried sends say nothing about the usual delay, so they are left out
+            delay = now - message.raised_at
+            queue.delay = delay if queue.delay is None else queue.delay + DELAY_ALPHA * (delay - queue.delay)
+            self._delay = delay if self._delay is None else self._delay + DELAY_ALPHA * (delay - self._delay)
+        self._done(message, True)
+
+    def _done(self, message: OutboundMessage, delivered: bool):
+        if self.on_done is not None:
+            try:
+                self.on_done(message, delivered)
+            except Exception:
+                logger.exception("Delivery callback failed for message to channel %s", message.channel_id)
+
+    def _failed(self, message: OutboundMessage, exc: Exception):
+        self.failed += 1
+        message.attempts += 1
+        delay = random.uniform(0, min(self.retry_cap, self.retry_base * 2 ** message.attempts))
+        if not self.retryable(exc):
+            self._give_up(message, f"{type(exc).__name__}: {exc}")
+        elif message.attempts >= self.retry_attempts:
+            self._give_up(message, f"out of attempts, last error {type(exc).__name__}: {exc}")
+        elif self.wall_clock() + delay >= message.expires_at:
+            self._give_up(message, f"stale before next attempt, last error {type(exc).__name__}: {exc}")
+        else:
+            logger.warning("Send to channel %s failed (%s); retry %s in %.1fs",
+                           message.channel_id, exc, message.attempts, delay)
+            self.retried += 1
+            self._retrying += 1
+            asyncio.get_running_loop().call_later(delay, self._retry, message)
+
+    def _mark_ready(self, channel_id: int, queue: _ChannelQueue):
+        if queue.busy or queue.waiting or not queue.pending:
+            return
+        priority = queue.pending[0].priority
+        if queue.ticket != -1 and queue.ticket_priority <= priority:
+            return  # already in the ready queue at least this urgently
+        # Any older, less urgent entry for this channel goes stale and is skipped.
+        queue.ticket = next(self._seq)
+        queue.ticket_priority = priority
+        self._ready.put_nowait((priority, queue.ticket, channel_id))
+
+    def _wake_channel(self, channel_id: int):
+        queue = self._channels.get(channel_id)
+        if queue is not None:
+            queue.waiting = False
+            self._mark_ready(channel_id, queue)
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            _, ticket, channel_id = await self._ready.get()
+            queue = self._channels[channel_id]
+            if queue.ticket != ticket:
+                continue  # superseded by a more urgent entry for the same channel
+            queue.ticket = -1
+
+            now = self.clock()
+            wait = max(queue.bucket.delay(now), self._global.delay(now))
+            if wait > 0:
+                queue.waiting = True
+                loop.call_later(wait, self._wake_channel, channel_id)
+                continue
+
+            message = heapq.heappop(queue.pending)
+            self._depth[message.priority] -= 1
+            if self.wall_clock() >= message.expires_at:
+                self.expired += 1
+                self._give_up(message, "stale before it could be sent")
+                self._mark_ready(channel_id, queue)
+                continue
+            queue.bucket.take()
+            self._global.take()
+            if message.attempts == 0:
+                self._waits[message.priority].add(now - message.enqueued_at)
+                if message.raised_at is not None:
+                    self._raise_to_send.add(self.wall_clock() - message.raised_at)
+            queue.busy = True
+            started = self.clock()
+            try:
+                await self._send(message)
+            except Exception as exc:
+                self._failed(message, exc)
+            else:
+                self.sent += 1
+                self._latency.add(self.clock() - started)
+                self._delivered(message, queue)
+            finally:
+                queue.busy = False
+            self._mark_ready(channel_id, queue)
+
+
+# ------------------------------------------------------
+# Coalescing
+# ------------------------------------------------------
+class Alert:
+    """
+    One timer warning or reminder on its way to a channel.
+
+    `text` is what gets sent when the alert ends up alone; without one (or when it
+    is too long) the alert is rendered like a combined message. In a combined message
+    the alert contributes `mention` to the header and `line` to the body; alerts
+    sharing a `group` share one line, followed by all of their `members` (e.g. user
+    mentions). `allowed_mentions` says, in Discord API form, which of those may
+    actually ping. `due_at` is the epoch time the alert should land at, `expires_at`
+    the one after which it is pointless, and `ref` the alert's outbox id when it is
+    tracked there.
+    """
+
+    __slots__ = ("text", "line", "priority", "mention", "group", "members", "expires_at", "due_at",
+                 "allowed_mentions", "ref", "raised_at")
+
+    def __init__(self, text: Optional[str], line: str, priority: int, mention: Optional[str] = None,
+                 group: Optional[str] = None, members: Sequence[str] = (),
+                 expires_at: Optional[float] = None, due_at: Optional[float] = None,
+                 allowed_mentions: Optional[Dict[str, Any]] = None):
+        self.text = text
+        self.line = line
+        self.priority = priority
+        self.mention = mention
+        self.group = group
+        self.members = members
+        self.expires_at = expires_at
+        self.due_at = due_at
+        self.allowed_mentions = allowed_mentions
+        self.ref: Optional[int] = None
+        self.raised_at: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__ if name not in ("ref", "raised_at")}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Alert":
+        return cls(**data)
+
+
+def merge_allowed_mentions(parts: Sequence[Optional[Dict[str, Any]]],
+                           content: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Allowed mentions for a message combining `parts`; None (Discord's default) if any
+    part has none. With `content`, only the users actually mentioned in it are listed,
+    so each part of a split message carries its own users.
+    """
+    if any(part is None for part in parts):
+        return None
+    parse: List[str] = []
+    users: List[str] = []
+    for part in parts:
+        parse.extend(part.get("parse", ()))
+        users.extend(part.get("users", ()))
+    if content is not None:
+        users = [user for user in users if f"<@{user}>" in content or f"<@!{user}>" in content]
+    merged: Dict[str, Any] = {"parse": list(dict.fromkeys(parse))}
+    if users:
+        merged["users"] = list(dict.fromkeys(users))[:MENTION_LIMIT]
+    return merged
+
+
+def _truncate(line: str, width: int) -> str:
+    return line if len(line) <= width else line[:max(width - 1, 0)] + "…"
+
+
+class _Batch:
+    __slots__ = ("alerts", "guild_id")
+
+    def __init__(self, guild_id: Optional[int]):
+        self.alerts: List[Alert] = []
+        self.guild_id = guild_id
+
+
+class Coalescer:
+    """
+    Holds alerts for `window` seconds per channel and sends each group as one message.
+
+    The window opens with the first alert for an idle channel. When it closes, the
+    alerts go out as a single message, or as several if the text would exceed
+    Discord's 2000 character limit. A window of 0 sends every alert on its own.
+
+    With an `outbox`, the messages built from outbox-tracked alerts are written
+    there, in place of those alerts, before they reach the dispatcher; the write
+    runs off the event loop and the messages are enqueued once it has committed.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, window: float = 2.0, limit: int = MESSAGE_LIMIT, outbox=None):
+        self.dispatcher = dispatcher
+        self.outbox = outbox
+        self.window = window
+        self.limit = limit
+        self._batches: Dict[int, _Batch] = {}
+        self._recording: Set["asyncio.Task[None]"] = set()
+        self.alerts = 0
+        self.messages = 0
+
+    def add(self, channel_id: int, alert: Alert, guild_id: Optional[int] = None):
+        self.alerts += 1
+        if alert.raised_at is None:
+            alert.raised_at = self.dispatcher.wall_clock()
+        if self.window <= 0:
+            self._emit(channel_id, guild_id, [alert])
+            return
+        batch = self._batches.get(channel_id)
+        if batch is None:
+            batch = self._batches[channel_id] = _Batch(guild_id)
+            asyncio.get_running_loop().call_later(self.window, self.flush, channel_id)
+        batch.alerts.append(alert)
+
+    def flush(self, channel_id: int):
+        batch = self._batches.pop(channel_id, None)
+        if batch is not None:
+            self._emit(channel_id, batch.guild_id, batch.alerts)
+
+    def render(self, alerts: List[Alert]) -> List[str]:
+        """Combine `alerts` into as few messages as fit under the character limit."""
+        mentions = list(dict.fromkeys(alert.mention for alert in alerts if alert.mention))
+        entries: List[Tuple[str, Optional[List[str]]]] = []
+        groups: Dict[str, List[str]] = {}
+        for alert in alerts:
+            if alert.group is None:
+                entries.append((alert.line, None))
+            elif alert.group in groups:
+                groups[alert.group].extend(alert.members)
+            else:
+                groups[alert.group] = list(alert.members)
+                entries.append((alert.line, groups[alert.group]))
+        body: List[Tuple[str, int]] = []
+        for line, members in entries:
+            if members is None:
+                body.append((line, 0))
+            else:
+                body.extend(self._wrap(f"{line} —", members))
+        return self._pack(" ".join(mentions), body)
+
+    # --------------------------------------------------
+    # Internals
+    # --------------------------------------------------
+    def _emit(self, channel_id: int, guild_id: Optional[int], alerts: List[Alert]):
+        text = alerts[0].text if len(alerts) == 1 else None
+        if text is not None and len(text) <= self.limit:
+            self._send(channel_id, guild_id, [text], alerts)
+        else:
+            self._send(channel_id, guild_id, self.render(alerts), alerts)
+
+    def _wrap(self, head: str, members: List[str]) -> List[Tuple[str, int]]:
+        """
+        `head` followed by `members`, continued on extra lines when it gets too long
+        or reaches MENTION_LIMIT members; returns (line, member count) pairs.
+        """
+        head = _truncate(head, self.limit // 2)  # leave room for members on every line
+        lines, current, count = [], head, 0
+        for member in dict.fromkeys(members):
+            if count == MENTION_LIMIT or len(current) + 1 + len(member) > self.limit:
+                lines.append((current, count))
+                current, count = head, 0
+            current = f"{current} {member}"
+            count += 1
+        lines.append((current, count))
+        return lines
+
+    def _pack(self, header: str, body: List[Tuple[str, int]]) -> List[str]:
+        """
+        Lines into messages under the character limit, each with at most MENTION_LIMIT
+        members. A line too long for a message of its own is cut short, and the header
+        always goes out with at least one line, so it never pings on its own.
+        """
+        messages, current, count, shown = [], header, 0, 0
+        for line, members in body:
+            if shown and (len(current) + 1 + len(line) > self.limit or count + members > MENTION_LIMIT):
+                messages.append(current)
+                current, count, shown = "", 0, 0
+            line = _truncate(line, self.limit - (len(current) + 1 if current else 0))
+            current = f"{current}\n{line}" if current else line
+            count += members
+            shown += 1
+        if shown:
+            messages.append(current)
+        return messages
+
+    def _send(self, channel_id: int, guild_id: Optional[int], messages: List[str], alerts: List[Alert]):
+        priority = min(alert.priority for alert in alerts)
+        # a combined message stays worth sending as long as any part of it is
+        expiries = [alert.expires_at for alert in alerts]
+        expires_at = None if None in expiries else max(expiries)
+        due = [alert.due_at for alert in alerts if alert.due_at is not None]
+        due_at = min(due) if due else None
+        raised_at = min(alert.raised_at for alert in alerts)
+        parts = [alert.allowed_mentions for alert in alerts]
+        mentions = [merge_allowed_mentions(parts, content) for content in messages]
+        refs = [alert.ref for alert in alerts if alert.ref is not None]
+        self.messages += len(messages)
+
+        def enqueue(created: Sequence[Tuple[Optional[int], Optional[str]]]):
+            for content, allowed_mentions, (ref, nonce) in zip(messages, mentions, created):
+                self.dispatcher.enqueue(channel_id, content, priority, guild_id, expires_at, ref, nonce, due_at,
+                                        raised_at, allowed_mentions)
+
+        if self.outbox is None or not refs:
+            enqueue([(None, None)] * len(messages))
+            return
+
+        async def record():
+            try:
+                created = await self.outbox.add_messages(channel_id, guild_id, messages, priority, expires_at, refs,
+                                                         allowed_mentions=mentions)
+            except Exception:
+                # still deliver; only a crash before the send could now lose or repeat it
+                logger.exception("Could not record %s message(s) for channel %s in the outbox", len(messages),
+                                 channel_id)
+                created = [(None, None)] * len(messages)
+            enqueue(created)
+        task = asyncio.create_task(record(), name=f"outbox-{channel_id}")
+        self._recording.add(task)
+        task.add_done_callback(self._recording.discard)
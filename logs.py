@@ -0,0 +1,108 @@
+import json
+import logging
+import logging.handlers
+import queue
+from typing import List, Optional
+
+TEXT_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+# Record attributes (passed with `extra=`) that JSON lines carry as fields of their own.
+CONTEXT_FIELDS = ("timer_id", "user_id", "guild_id")
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, message and any CONTEXT_FIELDS set on the record."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        for field in CONTEXT_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class Sampler(logging.Filter):
+    """Lets one in `every` records below WARNING through; warnings and errors always pass."""
+
+    def __init__(self, every: int):
+        super().__init__()
+        self.every = max(1, every)
+        self.seen = 0
+        self.dropped = 0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        self.seen += 1
+        if self.seen % self.every:
+            self.dropped += 1
+            return False
+        return True
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on the queue as they are, so %-interpolation happens on the listener thread.
+
+    The stock handler formats the message in prepare(), on the logging thread,
+    which for us is the event loop. Records never leave the process here, so they
+    need no flattening. Log arguments are plain values, so they read the same when
+    formatted a moment later. Closing the handler (logging.shutdown does it at exit)
+    stops the listener, which drains whatever is still queued.
+    """
+
+    def __init__(self, log_queue: "queue.SimpleQueue[logging.LogRecord]", listener: logging.handlers.QueueListener):
+        super().__init__(log_queue)
+        self.listener: Optional[logging.handlers.QueueListener] = listener
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        return record
+
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()
+        super().close()
+
+
+def setup_logging(level: int = logging.INFO, json_lines: bool = False, path: Optional[str] = None,
+                  max_bytes: int = 10 << 20, backups: int = 5) -> logging.Handler:
+    """
+    Route every log record through a queue to a listener thread that formats and writes it.
+
+    Output goes to stderr and, with `path`, to a file rotated at `max_bytes` with
+    `backups` old copies. Returns the root handler; closing it flushes and stops the
+    listener.
+    """
+    # Neither format shows the source line, thread or process, so skip collecting them
+    # for every record (the "Optimization" knobs from the logging HOWTO).
+    logging._srcfile = None
+    logging.logThreads = False
+    logging.logProcesses = False
+    logging.logMultiprocessing = False
+
+    formatter = JsonFormatter() if json_lines else logging.Formatter(TEXT_FORMAT)
+    handlers: List[logging.Handler] = [logging.StreamHandler()]
+    if path:
+        handlers.append(logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups,
+                                                             encoding="utf-8"))
+    for handler in handlers:
+        handler.setFormatter(formatter)
+
+    log_queue: "queue.SimpleQueue[logging.LogRecord]" = queue.SimpleQueue()
+    listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    root_handler = _DeferredQueueHandler(log_queue, listener)
+    root = logging.getLogger()
+    for old in root.handlers[:]:
+        root.removeHandler(old)
+    root.addHandler(root_handler)
+    root.setLevel(level)
+    listener.start()
+    return root_handler
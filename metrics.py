@@ -0,0 +1,204 @@
+import functools
+import math
+from datetime import datetime, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from delivery import Histogram
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Upper bounds (seconds) for latency histograms registered without explicit edges.
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.0, 3.0, 5.0, 10.0)
+# Upper bounds (characters) of the command response size histogram.
+SIZE_BUCKETS = (50, 100, 250, 500, 1000, 1500, 2000)
+OUTCOMES = ("ok", "validation", "exception")
+
+
+class Counter:
+    """A monotonically increasing count owned by the code that bumps it."""
+
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        self.value += amount
+
+
+Source = Union[Counter, Histogram, Callable[[], float]]
+
+
+class MetricsRegistry:
+    """
+    Metric families rendered in the OpenMetrics text format for `/metrics`.
+
+    Everything is registered up front, labels included, and the label sets are
+    formatted once at that point. Recording is a plain attribute increment or a
+    bisect into a fixed bucket list on objects that already exist. All of it
+    runs on the event loop thread, so nothing needs a lock. Values that are
+    already tracked elsewhere (queue depths, counts kept as stats) are passed
+    as callables and only read when the endpoint is scraped.
+    """
+
+    def __init__(self, prefix: str = ""):
+        self.prefix = prefix
+        self._families: Dict[str, Tuple[str, str, List[Tuple[str, Source]]]] = {}
+
+    def counter(self, name: str, help_text: str, labels: Optional[Dict[str, str]] = None,
+                fn: Optional[Callable[[], float]] = None) -> Optional[Counter]:
+        """A new Counter, or with `fn` a counter whose value is read from `fn` at scrape time."""
+        source = fn if fn is not None else Counter()
+        self._add(name, "counter", help_text, labels, source)
+        return None if fn is not None else source
+
+    def gauge(self, name: str, help_text: str, fn: Callable[[], float], labels: Optional[Dict[str, str]] = None):
+        self._add(name, "gauge", help_text, labels, fn)
+
+    def histogram(self, name: str, help_text: str, edges: Union[Sequence[float], Histogram] = LATENCY_BUCKETS,
+                  labels: Optional[Dict[str, str]] = None) -> Histogram:
+        """A new histogram with `edges`, or an existing Histogram exposed as is."""
+        histogram = edges if isinstance(edges, Histogram) else Histogram(edges)
+        self._add(name, "histogram", help_text, labels, histogram)
+        return histogram
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name, (kind, help_text, series) in self._families.items():
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"# HELP {name} {help_text}")
+            for labels, source in series:
+                if kind == "histogram":
+                    self._render_histogram(lines, name, labels, source)
+                elif kind == "counter":
+                    value = source.value if isinstance(source, Counter) else source()
+                    lines.append(f"{name}_total{{{labels}}} {_number(value)}" if labels
+                                 else f"{name}_total {_number(value)}")
+                else:
+                    lines.append(f"{name}{{{labels}}} {_number(source())}" if labels else f"{name} {_number(source())}")
+        lines.append("# EOF\n")
+        return "\n".join(lines)
+
+    # --------------------------------------------------
+    # Internals
+    # --------------------------------------------------
+    def _add(self, name: str, kind: str, help_text: str, labels: Optional[Dict[str, str]], source: Source):
+        name = self.prefix + name
+        family = self._families.setdefault(name, (kind, help_text, []))
+        if family[0] != kind:
+            raise ValueError(f"Metric {name} is already registered as a {family[0]}")
+        formatted = ",".join(f'{key}="{_escape(value)}"' for key, value in (labels or {}).items())
+        if any(existing == formatted for existing, _ in family[2]):
+            raise ValueError(f"Metric {name}{{{formatted}}} is already registered")
+        family[2].append((formatted, source))
+
+    @staticmethod
+    def _render_histogram(lines: List[str], name: str, labels: str, histogram: Histogram):
+        prefix = f"{labels}," if labels else ""
+        cumulative = 0
+        for edge, count in zip(histogram.edges, histogram.counts):
+            cumulative += count
+            lines.append(f'{name}_bucket{{{prefix}le="{edge:g}"}} {cumulative}')
+        lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {histogram.count}')
+        suffix = f"{{{labels}}}" if labels else ""
+        lines.append(f"{name}_count{suffix} {histogram.count}")
+        if all(edge >= 0 for edge in histogram.edges):  # OpenMetrics forbids _sum once a bucket is negative
+            lines.append(f"{name}_sum{suffix} {_number(histogram.sum)}")
+
+
+class _CommandSeries:
+    __slots__ = ("latency", "size", "outcomes")
+
+    def __init__(self, latency: Histogram, size: Histogram, outcomes: Dict[str, Counter]):
+        self.latency = latency
+        self.size = size
+        self.outcomes = outcomes
+
+
+class CommandMetrics:
+    """
+    Latency, outcome and response size of every slash command.
+
+    `instrument` wraps a command callback. The clock starts at the
+    interaction's creation time (Discord's snowflake timestamp), since that is
+    what the 3-second acknowledgement deadline runs against, and stops when the
+    callback returns. Commands here end with `return await ...send_message(...)`,
+    so that is when the response was accepted. The returned callback response
+    carries the message, which gives the response size, and `is_rejection`
+    decides from its content whether the command turned the input down.
+    A callback that raises counts as "exception".
+
+    Series are created per command by `register` before the bot takes
+    interactions, so recording only updates existing histograms and counters.
+    """
+
+    def __init__(self, registry: MetricsRegistry, is_rejection: Callable[[str], bool] = lambda content: False):
+        self.registry = registry
+        self.is_rejection = is_rejection
+        self._series: Dict[str, _CommandSeries] = {}
+
+    def register(self, name: str):
+        if name in self._series:
+            return
+        labels = {"command": name}
+        self._series[name] = _CommandSeries(
+            self.registry.histogram("command_latency_seconds", "Interaction creation to response sent.",
+                                    LATENCY_BUCKETS, labels),
+            self.registry.histogram("command_response_chars", "Length of the command's response.",
+                                    SIZE_BUCKETS, labels),
+            {outcome: self.registry.counter("command_outcomes", "Command invocations by outcome.",
+                                            {"command": name, "outcome": outcome})
+             for outcome in OUTCOMES},
+        )
+
+    def instrument(self, func: Callable[..., Awaitable[Any]]) -> Callable[..., Awaitable[Any]]:
+        @functools.wraps(func)
+        async def wrapper(interaction, *args, **kwargs):
+            result = None
+            outcome = "exception"
+            try:
+                result = await func(interaction, *args, **kwargs)
+                outcome = "ok"
+                return result
+            finally:
+                self._record(interaction, result, outcome)
+        return wrapper
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                "count": series.latency.count,
+                "outcomes": {outcome: counter.value for outcome, counter in series.outcomes.items()},
+                "latency_seconds": {"avg": round(series.latency.sum / series.latency.count, 4)
+                                    if series.latency.count else 0.0,
+                                    "p50": series.latency.quantile(0.5), "p95": series.latency.quantile(0.95)},
+                "response_chars": {"avg": round(series.size.sum / series.size.count)
+                                   if series.size.count else 0, "p95": series.size.quantile(0.95)},
+            }
+            for name, series in self._series.items()
+        }
+
+    def _record(self, interaction, result, outcome: str):
+        command = interaction.command
+        series = self._series.get(command.qualified_name) if command is not None else None
+        if series is None:
+            return
+        series.latency.observe(max(0.0, (datetime.now(timezone.utc) - interaction.created_at).total_seconds()))
+        content = getattr(getattr(result, "resource", None), "content", None)
+        if content is not None:
+            series.size.observe(len(content))
+            if outcome == "ok" and self.is_rejection(content):
+                outcome = "validation"
+        series.outcomes[outcome].inc()
+
+
+def _number(value: float) -> str:
+    if value is None or (isinstance(value, float) and math.isnan(value)):
+        return "NaN"
+    if isinstance(value, float) and math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
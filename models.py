@@ -0,0 +1,287 @@
+import math
+import sys
+import time
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from scheduler import ScheduledEvent
+
+HOP_INTERVAL = 7200  # boss cycle between hops
+WARNING_LEAD = 300   # "bosses in 5 minutes"
+
+# ------------------------------------------------------
+# Data Models
+# ------------------------------------------------------
+# Records only hold ids and epoch seconds; discord objects are looked up when a
+# message is actually sent, so a pending timer never pins a Member or channel.
+@dataclass(slots=True)
+class TimerData:
+    id: int
+    user_id: Optional[int]
+    channel_id: Optional[int]
+    guild_id: Optional[int]
+    initial_duration: int
+    region: str = "Unknown"
+    link: str = ""
+    hops: int = 1
+    remaining_hops: int = 1
+    start_time: float = field(default_factory=time.time)
+    alert_time: float = 0.0
+    event: Optional[ScheduledEvent] = None
+    lateness: float = 0.0  # how late the most recent hop fired against its anchor
+
+    def __post_init__(self):
+        self.region = sys.intern(self.region)
+
+    def anchor(self, hop: int) -> float:
+        """Alert time of `hop`, derived from the start time so lag never carries over."""
+        return self.start_time + self.initial_duration + hop * HOP_INTERVAL
+
+
+@dataclass(slots=True)
+class ReminderData:
+    id: int
+    user_id: int
+    channel_id: Optional[int]
+    keyword: str
+    start_time: float
+    duration: int
+    group: Optional["ReminderGroup"] = None
+
+    def __post_init__(self):
+        self.keyword = sys.intern(self.keyword)
+
+    @property
+    def deadline(self) -> float:
+        return self.start_time + self.duration
+
+
+class ReminderGroup:
+    """Reminders for one keyword in one channel that fire together on a single scheduler entry."""
+
+    __slots__ = ("channel_id", "keyword", "deadline", "members", "event")
+
+    def __init__(self, channel_id: Optional[int], keyword: str, deadline: float):
+        self.channel_id = channel_id
+        self.keyword = keyword
+        self.deadline = deadline
+        self.members: Dict[int, ReminderData] = {}
+        self.event: Optional[ScheduledEvent] = None
+
+    @property
+    def key(self) -> Tuple[Optional[int], str, float]:
+        return self.channel_id, self.keyword, self.deadline
+
+# ------------------------------------------------------
+# Timer registry
+# ------------------------------------------------------
+def normalize_link(link: str) -> str:
+    """Canonical form used for duplicate detection; invite codes stay case-sensitive."""
+    link = (link or "").strip()
+    for prefix in ("https://", "http://"):
+        if link.lower().startswith(prefix):
+            link = link[len(prefix):]
+            break
+    if link.lower().startswith("www."):
+        link = link[4:]
+    host, sep, path = link.partition("/")
+    return (host.lower() + sep + path).rstrip("/")
+
+
+class _Observable:
+    def __init__(self):
+        self._listeners: List[Callable[[str, object], None]] = []
+
+    def subscribe(self, listener: Callable[[str, object], None]):
+        """Call `listener(change, record)` after every "add", "update" and "remove"."""
+        self._listeners.append(listener)
+
+    def _notify(self, change: str, record):
+        for listener in self._listeners:
+            listener(change, record)
+
+
+class TimerRegistry(_Observable):
+    """
+    All active timers, indexed by id and normalized link.
+
+    Every lookup, insert and removal is a handful of dict operations. Iteration
+    yields timers in creation order. Subscribers hear about every change, so views
+    derived from the registry never have to rescan it.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._by_id: Dict[int, TimerData] = {}
+        self._by_link: Dict[str, TimerData] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __iter__(self) -> Iterator[TimerData]:
+        return iter(list(self._by_id.values()))
+
+    def __contains__(self, timer: TimerData) -> bool:
+        return self._by_id.get(timer.id) is timer
+
+    def get(self, timer_id: int) -> Optional[TimerData]:
+        return self._by_id.get(timer_id)
+
+    def by_link(self, link: str) -> Optional[TimerData]:
+        key = normalize_link(link)
+        return self._by_link.get(key) if key else None
+
+    def add(self, timer: TimerData):
+        link = normalize_link(timer.link)
+        # Validate everything before touching any index so a failed add leaves no trace.
+        if timer.id in self._by_id:
+            raise ValueError(f"Timer #{timer.id} is already registered.")
+        if link and link in self._by_link:
+            raise ValueError("A timer with that link already exists.")
+
+        self._by_id[timer.id] = timer
+        if link:
+            self._by_link[link] = timer
+        self._notify("add", timer)
+
+    def update(self, timer: TimerData):
+        """Record that `timer` moved on to another hop (its alert time changed)."""
+        if timer in self:
+            self._notify("update", timer)
+
+    def remove(self, timer: TimerData) -> bool:
+        if timer not in self:
+            return False
+        del self._by_id[timer.id]
+        link = normalize_link(timer.link)
+        if link and self._by_link.get(link) is timer:
+            del self._by_link[link]
+        self._notify("remove", timer)
+        return True
+
+
+# ------------------------------------------------------
+# Reminder registry
+# ------------------------------------------------------
+class _UserReminders:
+    """One user's reminders: by keyword then id, and in (deadline, id) order."""
+
+    __slots__ = ("by_keyword", "keys", "ordered")
+
+    def __init__(self):
+        self.by_keyword: Dict[str, Dict[int, ReminderData]] = {}
+        self.keys: List[Tuple[float, int]] = []
+        self.ordered: List[ReminderData] = []
+
+
+class ReminderRegistry(_Observable):
+    """
+    Active reminders indexed per user by keyword, then by reminder id.
+
+    Each user's reminders are also kept sorted by (deadline, id), so listing them
+    soonest first is a copy rather than a sort. Inserting and deleting shift the
+    list, which stays cheap at the few hundred reminders a heavy user holds.
+
+    Reminders for the same keyword and channel whose deadlines round up to the same
+    multiple of `granularity` seconds share a ReminderGroup, so the scheduler holds
+    one entry per distinct deadline rather than one per user. Subscribers hear
+    about every add and remove.
+    """
+
+    def __init__(self, granularity: float = 60.0):
+        super().__init__()
+        self.granularity = granularity
+        self._by_id: Dict[int, ReminderData] = {}
+        self._by_user: Dict[int, _UserReminders] = {}
+        self._groups: Dict[Tuple[Optional[int], str, float], ReminderGroup] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_id)
+
+    def __contains__(self, reminder: ReminderData) -> bool:
+        return self._by_id.get(reminder.id) is reminder
+
+    def get(self, reminder_id: int) -> Optional[ReminderData]:
+        return self._by_id.get(reminder_id)
+
+    @property
+    def groups(self) -> int:
+        return len(self._groups)
+
+    def group_deadline(self, deadline: float) -> float:
+        """`deadline` rounded up to the grouping granularity."""
+        if self.granularity <= 0:
+            return deadline
+        return math.ceil(deadline / self.granularity) * self.granularity
+
+    def add(self, reminder: ReminderData) -> ReminderGroup:
+        """
+        Register `reminder` and return the group it joined. A group that was just
+        created has no `event` yet; the caller schedules it.
+        """
+        if reminder.id in self._by_id:
+            raise ValueError(f"Reminder #{reminder.id} is already registered.")
+        self._by_id[reminder.id] = reminder
+        user = self._by_user.get(reminder.user_id)
+        if user is None:
+            user = self._by_user[reminder.user_id] = _UserReminders()
+        user.by_keyword.setdefault(reminder.keyword, {})[reminder.id] = reminder
+        entry = (reminder.deadline, reminder.id)
+        index = bisect_left(user.keys, entry)
+        user.keys.insert(index, entry)
+        user.ordered.insert(index, reminder)
+
+        key = (reminder.channel_id, reminder.keyword, self.group_deadline(reminder.deadline))
+        group = self._groups.get(key)
+        if group is None:
+            group = self._groups[key] = ReminderGroup(*key)
+        group.members[reminder.id] = reminder
+        reminder.group = group
+        self._notify("add", reminder)
+        return group
+
+    def remove(self, reminder: ReminderData) -> bool:
+        """
+        Unregister `reminder`. It keeps its `group` reference, so the caller can
+        tell from an empty `group.members` that the group's event is no longer needed.
+        """
+        if reminder not in self:
+            return False
+        del self._by_id[reminder.id]
+        group = reminder.group
+        if group is not None:
+            group.members.pop(reminder.id, None)
+            if not group.members and self._groups.get(group.key) is group:
+                del self._groups[group.key]
+        user = self._by_user[reminder.user_id]
+        same_keyword = user.by_keyword[reminder.keyword]
+        del same_keyword[reminder.id]
+        if not same_keyword:
+            del user.by_keyword[reminder.keyword]
+        if user.by_keyword:
+            index = bisect_left(user.keys, (reminder.deadline, reminder.id))
+            del user.keys[index]
+            del user.ordered[index]
+        else:
+            del self._by_user[reminder.user_id]
+        self._notify("remove", reminder)
+        return True
+
+    def find(self, user_id: int, keyword: str, reminder_id: Optional[int] = None) -> Optional[ReminderData]:
+        """The user's reminder for `keyword`: the given id, or the oldest one."""
+        user = self._by_user.get(user_id)
+        same_keyword = user.by_keyword.get(keyword) if user is not None else None
+        if not same_keyword:
+            return None
+        if reminder_id is not None:
+            return same_keyword.get(reminder_id)
+        return next(iter(same_keyword.values()))
+
+    def has_user(self, user_id: int) -> bool:
+        return user_id in self._by_user
+
+    def for_user(self, user_id: int) -> List[ReminderData]:
+        """The user's reminders, soonest first."""
+        user = self._by_user.get(user_id)
+        return list(user.ordered) if user is not None else []
@@ -0,0 +1,255 @@
+import asyncio
+import faulthandler
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+from delivery import Histogram
+
+logger = logging.getLogger("timer-bot")
+
+SENTINEL_INTERVAL = 0.02  # seconds between sentinel wake-ups
+SLOW_THRESHOLD = 0.1      # lag (seconds) that counts as a stall
+STACK_LIMIT = 30          # innermost frames kept per captured stack
+WATCHDOG_TIMEOUT = 10.0   # seconds without a heartbeat before the loop counts as wedged
+
+
+class LoopMonitor:
+    """
+    Measures event-loop lag continuously and names the code behind each stall.
+
+    A sentinel coroutine sleeps `interval` seconds at a time. How late it wakes
+    up is the loop lag at that moment. Samples go into a fixed-size window for
+    percentiles and, optionally, into a Histogram for /metrics.
+
+    A stall cannot be profiled from inside the loop, because the loop is busy.
+    A daemon thread therefore polls the sentinel's next deadline. Once the
+    deadline is more than `threshold` overdue, the thread grabs the loop
+    thread's current frame with sys._current_frames(). That frame is the
+    callback still running, caught in the act. When the sentinel wakes up again,
+    the stall is logged with that stack and kept in `slow` for the HTTP view.
+    This works without asyncio debug mode, which costs too much to leave on in
+    production.
+    """
+
+    def __init__(self, interval: float = SENTINEL_INTERVAL, threshold: float = SLOW_THRESHOLD,
+                 window: int = 3000, keep: int = 20, histogram: Optional[Histogram] = None,
+                 clock: Callable[[], float] = time.perf_counter):
+        self.interval = interval
+        self.threshold = threshold
+        self.histogram = histogram
+        self.clock = clock
+        self.samples: Deque[float] = deque(maxlen=window)
+        self.slow: Deque[Dict[str, Any]] = deque(maxlen=keep)
+        self.stalls = 0
+        self.worst = 0.0
+        self._deadline = float("inf")  # when the sentinel should next run; read by the sampler thread
+        self._captured: Optional[tuple] = None  # (deadline, stack) written by the sampler thread
+        self._loop_thread: Optional[int] = None
+        self._stop = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> asyncio.Task:
+        """Start the sentinel and the sampler thread; call from the event loop thread."""
+        if self._task is None or self._task.done():
+            self._loop_thread = threading.get_ident()
+            self._stop.clear()
+            self._task = asyncio.create_task(self._run(), name="loop-monitor")
+            threading.Thread(target=self._sample, name="loop-monitor", daemon=True).start()
+        return self._task
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    def percentiles(self) -> Dict[str, float]:
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {"p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+        pick = lambda q: round(ordered[min(len(ordered) - 1, int(q * len(ordered)))], 5)
+        return {"p50": pick(0.5), "p90": pick(0.9), "p99": pick(0.99), "max": round(ordered[-1], 5)}
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "interval": self.interval,
+            "threshold": self.threshold,
+            "samples": len(self.samples),
+            "lag_seconds": self.percentiles(),
+            "worst": round(self.worst, 4),
+            "stalls": self.stalls,
+            "recent_stalls": list(self.slow),
+        }
+
+    # --------------------------------------------------
+    # Internals
+    # --------------------------------------------------
+    async def _run(self):
+        try:
+            while True:
+                deadline = self._deadline = self.clock() + self.interval
+                await asyncio.sleep(self.interval)
+                lag = max(0.0, self.clock() - deadline)
+                self.samples.append(lag)
+                if self.histogram is not None:
+                    self.histogram.observe(lag)
+                if lag >= self.threshold:
+                    self._stalled(deadline, lag)
+        finally:
+            self._deadline = float("inf")
+
+    def _stalled(self, deadline: float, lag: float):
+        captured = self._captured
+        stack = captured[1] if captured is not None and captured[0] == deadline else None
+        self.stalls += 1
+        self.worst = max(self.worst, lag)
+        self.slow.append({"at": round(time.time(), 3), "lag": round(lag, 4), "stack": stack})
+        if stack is None:
+            logger.warning("🐢 Event loop stalled for %.0f ms (too short to sample a stack)", lag * 1000)
+        else:
+            logger.warning("🐢 Event loop stalled for %.0f ms in:\n%s", lag * 1000, stack)
+
+    def _sample(self):
+        poll = self.threshold / 4
+        while not self._stop.wait(poll):
+            deadline = self._deadline
+            captured = self._captured
+            if self.clock() - deadline < self.threshold or (captured is not None and captured[0] == deadline):
+                continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is not None:
+                self._captured = (deadline, "".join(traceback.format_stack(frame, limit=STACK_LIMIT)))
+            del frame
+
+
+class Watchdog:
+    """
+    OS thread that notices when the event loop stops running and records why.
+
+    The loop pings a heartbeat every `timeout / 4` seconds, which costs one
+    timestamp per ping. The watchdog thread checks the heartbeat at the same
+    rate. When it is more than `timeout` old, the thread writes a report to
+    `path`: every thread's stack via faulthandler, then each asyncio task with
+    its stack. The report is written once per stall, and recovery is logged.
+    The file rotates once it exceeds `max_bytes`, keeping `backups` old copies.
+
+    With `restart` set, the watchdog then calls `checkpoint` and exits the
+    process, so the supervisor restarts the bot straight away instead of
+    waiting for the uptime monitor. `checkpoint` runs on the watchdog thread
+    while the loop is stuck, so it must be safe to call from there.
+    """
+
+    def __init__(self, path: str, timeout: float = WATCHDOG_TIMEOUT, max_bytes: int = 1 << 20, backups: int = 3,
+                 restart: bool = False, checkpoint: Optional[Callable[[], None]] = None,
+                 clock: Callable[[], float] = time.monotonic):
+        self.path = path
+        self.timeout = timeout
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.restart = restart
+        self.checkpoint = checkpoint
+        self.clock = clock
+        self.dumps = 0
+        self._beat = clock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._stop = threading.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> asyncio.Task:
+        """Start the heartbeat and the watchdog thread; call from the event loop thread."""
+        if self._task is None or self._task.done():
+            self._loop = asyncio.get_running_loop()
+            self._beat = self.clock()
+            self._stop.clear()
+            self._task = asyncio.create_task(self._heartbeat(), name="watchdog-heartbeat")
+            threading.Thread(target=self._watch, name="watchdog", daemon=True).start()
+        return self._task
+
+    def stop(self):
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"timeout": self.timeout, "heartbeat_age": round(self.clock() - self._beat, 3), "dumps": self.dumps}
+
+    # --------------------------------------------------
+    # Internals
+    # --------------------------------------------------
+    async def _heartbeat(self):
+        while True:
+            self._beat = self.clock()
+            await asyncio.sleep(self.timeout / 4)
+
+    def _watch(self):
+        stalled_since: Optional[float] = None
+        while not self._stop.wait(self.timeout / 4):
+            beat = self._beat
+            age = self.clock() - beat
+            if age < self.timeout:
+                if stalled_since is not None:
+                    logger.warning("🐕 Event loop is responsive again after %.1fs", self.clock() - stalled_since)
+                    stalled_since = None
+                continue
+            if stalled_since is not None:
+                continue
+            stalled_since = beat
+            logger.error("🐕 Event loop missed its heartbeat for %.1fs; writing stacks to %s", age, self.path)
+            try:
+                self._dump(age)
+            except OSError as exc:
+                logger.error("Could not write watchdog report to %s: %s", self.path, exc)
+            if self.restart:
+                self._restart()
+
+    def _dump(self, age: float):
+        self._rotate()
+        with open(self.path, "a", encoding="utf-8") as f:
+            stamp = time.strftime("%Y-%m-%d %H:%M:%S")
+            f.write(f"===== {stamp}: event loop unresponsive for {age:.1f}s =====\n\n--- threads ---\n")
+            f.flush()
+            faulthandler.dump_traceback(file=f, all_threads=True)
+            f.write("\n--- asyncio tasks ---\n")
+            for task in self._tasks():
+                f.write(f"{task!r}\n")
+                task.print_stack(limit=STACK_LIMIT, file=f)
+            f.write("\n")
+        self.dumps += 1
+
+    def _tasks(self) -> List[asyncio.Task]:
+        # all_tasks() is not meant to be called off the loop; the loop is stuck, but retry a torn read anyway
+        for _ in range(3):
+            try:
+                return list(asyncio.all_tasks(self._loop))
+            except RuntimeError:
+                continue
+        return []
+
+    def _rotate(self):
+        try:
+            if os.path.getsize(self.path) < self.max_bytes:
+                return
+        except OSError:
+            return
+        for i in range(self.backups - 1, 0, -1):
+            if os.path.exists(f"{self.path}.{i}"):
+                os.replace(f"{self.path}.{i}", f"{self.path}.{i + 1}")
+        if self.backups:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def _restart(self):
+        if self.checkpoint is not None:
+            try:
+                self.checkpoint()
+            except Exception:
+                logger.exception("Watchdog checkpoint failed")
+        logger.critical("🐕 Exiting so the supervisor restarts the bot")
+        logging.shutdown()
+        os._exit(1)
@@ -0,0 +1,215 @@
+import asyncio
+import functools
+import json
+import logging
+import secrets
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple, TypeVar
+
+logger = logging.getLogger("timer-bot")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS alert_keys (
+    key        TEXT PRIMARY KEY,
+    created_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS alerts (
+    id         INTEGER PRIMARY KEY,
+    channel_id INTEGER NOT NULL,
+    guild_id   INTEGER,
+    payload    TEXT NOT NULL,
+    message_id INTEGER
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id         INTEGER PRIMARY KEY,
+    channel_id INTEGER NOT NULL,
+    guild_id   INTEGER,
+    content    TEXT NOT NULL,
+    priority   INTEGER NOT NULL,
+    expires_at REAL,
+    nonce      TEXT NOT NULL,
+    allowed_mentions TEXT
+);
+CREATE INDEX IF NOT EXISTS alerts_by_message ON alerts (message_id);
+"""
+
+KEY_RETENTION = 7 * 86400  # how long a fired alert's key blocks it from firing again
+
+T = TypeVar("T")
+
+
+class Outbox:
+    """
+    Transactional outbox for alerts, in its own SQLite file.
+
+    An alert is recorded together with the idempotency keys of whatever produced it
+    (a timer hop's warning, a reminder) in one transaction, before it is sent; a key
+    that is already present means the alert went out before a restart and is not
+    recorded again. When alerts are packed into messages, the messages replace them
+    in another transaction, and a message row is deleted only once Discord has
+    acknowledged it. Every message carries a nonce that Discord enforces, so a
+    message re-sent after a crash between the send and its acknowledgement is not
+    posted twice.
+
+    After `open`, every write runs on one outbox thread, in submission order; in WAL
+    mode with synchronous=NORMAL a commit survives the process being killed at any
+    point. The event loop awaits `transact` and `add_messages`, so nothing is handed
+    to the dispatcher before the write behind it has committed, and `remove` only
+    queues the delete.
+    """
+
+    def __init__(self, path: str, key_retention: float = KEY_RETENTION):
+        self.path = path
+        self.key_retention = key_retention
+        self._conn: Optional[sqlite3.Connection] = None
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    def open(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Create the schema and return what is still owed: (unpacked alerts, unsent messages)."""
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        if "allowed_mentions" not in {row[1] for row in conn.execute("PRAGMA table_info(messages)")}:
+            conn.execute("ALTER TABLE messages ADD COLUMN allowed_mentions TEXT")
+        conn.execute("DELETE FROM alert_keys WHERE created_at < ?", (time.time() - self.key_retention,))
+        conn.row_factory = sqlite3.Row
+        alerts = [dict(row) for row in conn.execute(
+            "SELECT id, channel_id, guild_id, payload FROM alerts WHERE message_id IS NULL ORDER BY id")]
+        messages = [dict(row) for row in conn.execute("SELECT * FROM messages ORDER BY id")]
+        conn.row_factory = None
+        for alert in alerts:
+            alert["payload"] = json.loads(alert["payload"])
+        for message in messages:
+            if message["allowed_mentions"] is not None:
+                message["allowed_mentions"] = json.loads(message["allowed_mentions"])
+        self._conn = conn
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="outbox")
+        if alerts or messages:
+            logger.info("📤 Resuming %s alerts and %s messages from %s", len(alerts), len(messages), self.path)
+        return alerts, messages
+
+    def close(self):
+        """Finish the queued writes, then close the database."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    # --------------------------------------------------
+    # Called from the event loop
+    # --------------------------------------------------
+    async def transact(self, work: Callable[["Outbox"], T]) -> T:
+        """
+        Run `work(outbox)` inside one transaction on the outbox thread and return its
+        result once committed. `work` makes the `claim` and `add_alert` calls.
+        """
+        return await self._run(self._transact, work)
+
+    async def add_messages(self, channel_id: int, guild_id: Optional[int], contents: Sequence[str], priority: int,
+                           expires_at: Optional[float], alert_ids: Sequence[int],
+                           nonce: Optional[str] = None,
+                           allowed_mentions: Optional[Sequence[Optional[Dict[str, Any]]]] = None
+                           ) -> List[Tuple[int, str]]:
+        """
+        Replace the alerts `alert_ids` with the messages `contents`; returns (id, nonce)
+        per message once committed. `allowed_mentions`, when given, has one entry per
+        message. The alerts hang off the last message, so they are only gone once every
+        part has been delivered.
+        """
+        return await self._run(self._add_messages, channel_id, guild_id, contents, priority, expires_at, alert_ids,
+                               nonce, allowed_mentions)
+
+    def remove(self, message_id: int):
+        """The message was acknowledged (or given up on): queue forgetting it and the alerts it carried."""
+        self._executor.submit(self._remove, message_id).add_done_callback(self._log_failure)
+
+    def __len__(self) -> int:
+        """Alerts and messages still owed, counted after the queued writes (blocks until then)."""
+        return self._executor.submit(self._count).result()
+
+    def _run(self, fn: Callable[..., T], *args) -> "asyncio.Future[T]":
+        return asyncio.get_running_loop().run_in_executor(self._executor, functools.partial(fn, *args))
+
+    @staticmethod
+    def _log_failure(future):
+        if future.exception() is not None:
+            logger.error("Outbox write failed: %s", future.exception())
+
+    # --------------------------------------------------
+    # Outbox thread
+    # --------------------------------------------------
+    def _transact(self, work: Callable[["Outbox"], T]) -> T:
+        with self.transaction():
+            return work(self)
+
+    @contextmanager
+    def transaction(self) -> Iterator["Outbox"]:
+        """Group `claim` and `add_alert` calls; nothing is visible after a crash unless it commits."""
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield self
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        conn.execute("COMMIT")
+
+    # --------------------------------------------------
+    # Inside a transaction (outbox thread)
+    # --------------------------------------------------
+    def claim(self, keys: Sequence[str]) -> List[str]:
+        """Record `keys` and return the ones that had not been recorded before."""
+        now = time.time()
+        fresh = []
+        for key in keys:
+            if self._conn.execute("INSERT OR IGNORE INTO alert_keys VALUES (?, ?)", (key, now)).rowcount:
+                fresh.append(key)
+        return fresh
+
+    def add_alert(self, channel_id: int, guild_id: Optional[int], payload: Dict[str, Any]) -> int:
+        cursor = self._conn.execute(
+            "INSERT INTO alerts (channel_id, guild_id, payload) VALUES (?, ?, ?)",
+            (channel_id, guild_id, json.dumps(payload, ensure_ascii=False)),
+        )
+        return cursor.lastrowid
+
+    # --------------------------------------------------
+    # Messages (each call commits on its own)
+    # --------------------------------------------------
+    def _add_messages(self, channel_id: int, guild_id: Optional[int], contents: Sequence[str], priority: int,
+                      expires_at: Optional[float], alert_ids: Sequence[int], nonce: Optional[str],
+                      allowed_mentions: Optional[Sequence[Optional[Dict[str, Any]]]]) -> List[Tuple[int, str]]:
+        created = []
+        per_message = allowed_mentions if allowed_mentions is not None else [None] * len(contents)
+        with self.transaction():
+            for content, message_mentions in zip(contents, per_message):
+                mentions = json.dumps(message_mentions) if message_mentions is not None else None
+                message_nonce = nonce or secrets.token_hex(8)
+                cursor = self._conn.execute(
+                    "INSERT INTO messages (channel_id, guild_id, content, priority, expires_at, nonce, allowed_mentions)"
+                    " VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (channel_id, guild_id, content, priority, expires_at, message_nonce, mentions),
+                )
+                created.append((cursor.lastrowid, message_nonce))
+            if alert_ids and created:
+                self._conn.executemany(
+                    "UPDATE alerts SET message_id = ? WHERE id = ?",
+                    [(created[-1][0], alert_id) for alert_id in alert_ids],
+                )
+        return created
+
+    def _remove(self, message_id: int):
+        with self.transaction():
+            self._conn.execute("DELETE FROM alerts WHERE message_id = ?", (message_id,))
+            self._conn.execute("DELETE FROM messages WHERE id = ?", (message_id,))
+
+    def _count(self) -> int:
+        alerts, = self._conn.execute("SELECT COUNT(*) FROM alerts WHERE message_id IS NULL").fetchone()
+        messages, = self._conn.execute("SELECT COUNT(*) FROM messages").fetchone()
+        return alerts + messages
@@ -0,0 +1,314 @@
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Callable, List, Optional, Set, Tuple
+
+logger = logging.getLogger("timer-bot")
+
+# ------------------------------------------------------
+# Scheduled events
+# ------------------------------------------------------
+class ScheduledEvent:
+    """A single pending deadline. `bucket` is set while the event sits in the timing wheel."""
+
+    __slots__ = ("deadline", "handler", "args", "active", "bucket")
+
+    def __init__(self, deadline: float, handler: Callable[..., Any], args: Tuple[Any, ...]):
+        self.deadline = deadline
+        self.handler = handler
+        self.args = args
+        self.active = True
+        self.bucket: Optional["_Bucket"] = None
+
+
+# ------------------------------------------------------
+# Hierarchical timing wheel
+# ------------------------------------------------------
+class _Bucket(set):
+    __slots__ = ("level",)
+
+    def __init__(self, level: int):
+        super().__init__()
+        self.level = level
+
+
+class TimingWheel:
+    """
+    Hierarchical timing wheel with second, minute, hour and day buckets.
+
+    Events are bucketed by the whole second of their deadline. An event lives in the
+    finest wheel that still shares its enclosing minute/hour/day with the current tick
+    and cascades down when that boundary is reached. Anything further out than `days`
+    waits in an overflow bucket that is re-examined once per day. Insert and cancel are
+    O(1); `advance` only visits buckets that actually hold events.
+    """
+
+    SECOND, MINUTE, HOUR, DAY, OVERFLOW = range(5)
+
+    def __init__(self, now: float, days: int = 366):
+        self._tick = int(now)
+        self._days = days
+        self._seconds = [_Bucket(self.SECOND) for _ in range(60)]
+        self._minutes = [_Bucket(self.MINUTE) for _ in range(60)]
+        self._hours = [_Bucket(self.HOUR) for _ in range(24)]
+        self._day_slots = [_Bucket(self.DAY) for _ in range(days)]
+        self._overflow = _Bucket(self.OVERFLOW)
+        self._counts = [0] * 5
+
+    def __len__(self) -> int:
+        return sum(self._counts)
+
+    @property
+    def tick(self) -> int:
+        return self._tick
+
+    def add(self, event: ScheduledEvent) -> bool:
+        """Bucket `event`; returns False if its second has already been processed."""
+        tick = int(event.deadline)
+        if tick <= self._tick:
+            return False
+        self._place(event, tick)
+        return True
+
+    def remove(self, event: ScheduledEvent):
+        bucket = event.bucket
+        if bucket is not None:
+            bucket.discard(event)
+            self._counts[bucket.level] -= 1
+            event.bucket = None
+
+    def next_tick(self) -> Optional[int]:
+        """Earliest second at which `advance` has something to fire or cascade."""
+        now = self._tick
+        counts = self._counts
+        if counts[self.SECOND]:
+            for t in range(now + 1, (now // 60 + 1) * 60):
+                if self._seconds[t % 60]:
+                    return t
+        if counts[self.MINUTE]:
+            for m in range(now // 60 + 1, (now // 3600 + 1) * 60):
+                if self._minutes[m % 60]:
+                    return m * 60
+        if counts[self.HOUR]:
+            for h in range(now // 3600 + 1, (now // 86400 + 1) * 24):
+                if self._hours[h % 24]:
+                    return h * 3600
+        if counts[self.DAY]:
+            for d in range(now // 86400 + 1, now // 86400 + self._days):
+                if self._day_slots[d % self._days]:
+                    return d * 86400
+        if counts[self.OVERFLOW]:
+            return (now // 86400 + 1) * 86400
+        return None
+
+    def advance(self, now: float) -> List[ScheduledEvent]:
+        """Move the wheel up to `now` and return every event whose second has been reached."""
+        target = int(now)
+        expired: List[ScheduledEvent] = []
+        while self._tick < target:
+            tick = self.next_tick()
+            if tick is None or tick > target:
+                # Nothing lives between here and the target, so skip straight to it.
+                self._tick = target
+                break
+            self._tick = tick
+            self._cascade(tick)
+            bucket = self._seconds[tick % 60]
+            if bucket:
+                self._counts[self.SECOND] -= len(bucket)
+                for event in bucket:
+                    event.bucket = None
+                expired.extend(bucket)
+                bucket.clear()
+        return expired
+
+    def drain(self) -> List[ScheduledEvent]:
+        """Remove and return every bucketed event."""
+        events: List[ScheduledEvent] = []
+        for bucket in self._buckets():
+            for event in bucket:
+                event.bucket = None
+            events.extend(bucket)
+            bucket.clear()
+        self._counts = [0] * 5
+        return events
+
+    # --------------------------------------------------
+    # Internals
+    # --------------------------------------------------
+    def _buckets(self):
+        yield from self._seconds
+        yield from self._minutes
+        yield from self._hours
+        yield from self._day_slots
+        yield self._overflow
+
+    def _place(self, event: ScheduledEvent, tick: int):
+        now = self._tick
+        if tick // 60 == now // 60:
+            bucket = self._seconds[tick % 60]
+        elif tick // 3600 == now // 3600:
+            bucket = self._minutes[(tick // 60) % 60]
+        elif tick // 86400 == now // 86400:
+            bucket = self._hours[(tick // 3600) % 24]
+        elif tick // 86400 - now // 86400 < self._days:
+            bucket = self._day_slots[(tick // 86400) % self._days]
+        else:
+            bucket = self._overflow
+        bucket.add(event)
+        event.bucket = bucket
+        self._counts[bucket.level] += 1
+
+    def _cascade(self, tick: int):
+        # Coarsest first, so an event can fall through several wheels in one tick.
+        if tick % 86400 == 0:
+            self._replace(self._day_slots[(tick // 86400) % self._days])
+            self._replace(self._overflow)
+        if tick % 3600 == 0:
+            self._replace(self._hours[(tick // 3600) % 24])
+        if tick % 60 == 0:
+            self._replace(self._minutes[(tick // 60) % 60])
+
+    def _replace(self, bucket: _Bucket):
+        if not bucket:
+            return
+        events = list(bucket)
+        bucket.clear()
+        self._counts[bucket.level] -= len(events)
+        for event in events:
+            self._place(event, int(event.deadline))
+
+
+# ------------------------------------------------------
+# Scheduler
+# ------------------------------------------------------
+class Scheduler:
+    """
+    One coroutine that owns every timer and reminder deadline.
+
+    Deadlines further out than the current second sit in a TimingWheel, so scheduling
+    and cancelling are O(1). Once the wheel hands them over they move into a small
+    min-heap of (deadline, seq, event) for sub-second precision. The run loop sleeps
+    until the earliest of the two and is woken early when something earlier is
+    scheduled. Handlers are coroutine functions and only become tasks once they fire.
+
+    Deadlines are epoch seconds, but the scheduler measures them on the monotonic
+    clock plus a fixed offset, so NTP slews and small wall-clock steps never move
+    them. Every wake-up compares the two clocks; a disagreement beyond
+    `jump_threshold` (NTP step, suspend/resume, VM pause) moves the offset once and
+    everything that became overdue is dispatched together in that same pass.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic, wall_clock: Callable[[], float] = time.time,
+                 jump_threshold: float = 2.0, max_sleep: float = 30.0):
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.jump_threshold = jump_threshold
+        self.max_sleep = max_sleep  # bounds how long a clock jump can go unnoticed
+        self._offset = wall_clock() - clock()
+        self._wheel = TimingWheel(self.now())
+        self._heap: List[Tuple[float, int, ScheduledEvent]] = []
+        self._seq = itertools.count()
+        self._pending = 0
+        self._wake_at = float("inf")
+        self._waiter: Optional[asyncio.Future] = None
+        self._running: Set[asyncio.Task] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return self._pending
+
+    def now(self) -> float:
+        """Current time on the scheduler's clock, in epoch seconds."""
+        return self.clock() + self._offset
+
+    def schedule(self, deadline: float, handler: Callable[..., Any], *args: Any) -> ScheduledEvent:
+        event = ScheduledEvent(deadline, handler, args)
+        if not self._wheel.add(event):
+            heapq.heappush(self._heap, (deadline, next(self._seq), event))
+        self._pending += 1
+        if deadline < self._wake_at:
+            self._wake()
+        return event
+
+    def cancel(self, event: Optional[ScheduledEvent]):
+        if event is not None and event.active:
+            event.active = False
+            self._wheel.remove(event)
+            self._pending -= 1
+
+    def start(self) -> asyncio.Task:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run(), name="scheduler")
+        return self._task
+
+    async def run(self):
+        while True:
+            jump = self._check_clock()
+            now = self.now()
+            due = self._collect(now)
+            if jump:
+                logger.warning("⏱ Clock jump of %+.1fs detected; dispatching %s overdue events at once", jump, len(due))
+            for event in due:
+                self._dispatch(event)
+            # Drop cancelled entries sitting at the top so we don't wake up for them.
+            while self._heap and not self._heap[0][2].active:
+                heapq.heappop(self._heap)
+            wake_at = self._heap[0][0] if self._heap else float("inf")
+            next_tick = self._wheel.next_tick()
+            if next_tick is not None:
+                wake_at = min(wake_at, next_tick)
+            await self._sleep(wake_at, now)
+
+    # --------------------------------------------------
+    # Internals
+    # --------------------------------------------------
+    def _check_clock(self) -> float:
+        skew = self.wall_clock() - self.now()
+        if abs(skew) < self.jump_threshold:
+            return 0.0
+        # A backwards step needs no re-bucketing: the wheel only ever sees deadlines
+        # later than its own position, and anything earlier goes through the heap.
+        self._offset += skew
+        return skew
+
+    def _collect(self, now: float) -> List[ScheduledEvent]:
+        for event in self._wheel.advance(now):
+            heapq.heappush(self._heap, (event.deadline, next(self._seq), event))
+        due = []
+        while self._heap and self._heap[0][0] <= now:
+            _, _, event = heapq.heappop(self._heap)
+            if event.active:
+                event.active = False
+                self._pending -= 1
+                due.append(event)
+        return due
+
+    def _wake(self):
+        if self._waiter is not None and not self._waiter.done():
+            self._waiter.set_result(None)
+
+    async def _sleep(self, wake_at: float, now: float):
+        loop = asyncio.get_running_loop()
+        self._waiter = loop.create_future()
+        self._wake_at = wake_at
+        handle = loop.call_later(min(wake_at - now, self.max_sleep), self._wake)
+        try:
+            await self._waiter
+        finally:
+            self._waiter = None
+            self._wake_at = float("inf")
+            if handle is not None:
+                handle.cancel()
+
+    def _dispatch(self, event: ScheduledEvent):
+        task = asyncio.create_task(event.handler(*event.args))
+        self._running.add(task)
+        task.add_done_callback(self._handler_done)
+
+    def _handler_done(self, task: asyncio.Task):
+        self._running.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error("Scheduled handler failed", exc_info=task.exception())
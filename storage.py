@@ -0,0 +1,477 @@
+import logging
+import os
+import queue
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("timer-bot")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS timers (
+    id               INTEGER PRIMARY KEY,
+    user_id          INTEGER,
+    channel_id       INTEGER,
+    guild_id         INTEGER,
+    initial_duration INTEGER NOT NULL,
+    region           TEXT NOT NULL,
+    link             TEXT NOT NULL,
+    hops             INTEGER NOT NULL,
+    remaining_hops   INTEGER NOT NULL,
+    start_time       REAL NOT NULL,
+    alert_time       REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS reminders (
+    id         INTEGER PRIMARY KEY,
+    user_id    INTEGER NOT NULL,
+    channel_id INTEGER,
+    keyword    TEXT NOT NULL,
+    start_time REAL NOT NULL,
+    duration   INTEGER NOT NULL
+);
+"""
+
+_UPSERT_TIMER = (
+    "INSERT OR REPLACE INTO timers (id, user_id, channel_id, guild_id, initial_duration, region, link,"
+    " hops, remaining_hops, start_time, alert_time) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+)
+_HOP_TIMER = "UPDATE timers SET remaining_hops = ?, alert_time = ? WHERE id = ?"
+_DELETE_TIMER = "DELETE FROM timers WHERE id = ?"
+_INSERT_REMINDER = (
+    "INSERT OR REPLACE INTO reminders (id, user_id, channel_id, keyword, start_time, duration)"
+    " VALUES (?, ?, ?, ?, ?, ?)"
+)
+_DELETE_REMINDER = "DELETE FROM reminders WHERE id = ?"
+
+_STOP = object()
+
+
+# ------------------------------------------------------
+# Background writer
+# ------------------------------------------------------
+class _BackgroundWriter:
+    """Queue fed from the event loop and drained in batches by a single writer thread."""
+
+    thread_name = "timer-store"
+
+    def __init__(self, batch_size: int = 500):
+        self.batch_size = batch_size
+        self._queue: "queue.Queue[Any]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+
+    def close(self):
+        if self._thread is not None:
+            self._queue.put(_STOP)
+            self._thread.join()
+            self._thread = None
+            self._writer_closed()
+
+    def _start_writer(self):
+        self._thread = threading.Thread(target=self._writer, name=self.thread_name, daemon=True)
+        self._thread.start()
+
+    def _put(self, item: Any):
+        self._queue.put(item)
+
+    def _writer(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            stop = any(item is _STOP for item in batch)
+            writes = [item for item in batch if item is not _STOP]
+            if writes:
+                self._write_batch(writes)
+            if stop:
+                return
+
+    def _write_batch(self, writes: List[Any]):
+        raise NotImplementedError
+
+    def _writer_closed(self):
+        pass
+
+
+# ------------------------------------------------------
+# SQLite store
+# ------------------------------------------------------
+class TimerStore(_BackgroundWriter):
+    """
+    Durable copy of every active timer and reminder, kept in SQLite (WAL mode).
+
+    The mutators only snapshot the row and
+    put it on a queue; a writer thread commits whatever has queued up in a single
+    transaction, so command handlers never wait on disk.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500):
+        super().__init__(batch_size)
+        self.path = path
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def open(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        """Create the schema, start the writer and return the stored (timers, reminders) rows."""
+        conn = self._connect()
+        conn.row_factory = sqlite3.Row
+        timers = [dict(row) for row in conn.execute("SELECT * FROM timers ORDER BY id")]
+        reminders = [dict(row) for row in conn.execute("SELECT * FROM reminders ORDER BY id")]
+        conn.row_factory = None
+        self._conn = conn
+        self._start_writer()
+        logger.info("💾 Loaded %s timers and %s reminders from %s", len(timers), len(reminders), self.path)
+        return timers, reminders
+
+    # --------------------------------------------------
+    # Mutations (called from the event loop)
+    # --------------------------------------------------
+    def timer_created(self, timer):
+        self._put((_UPSERT_TIMER, _timer_row(timer)))
+
+    def timer_hopped(self, timer):
+        self._put((_HOP_TIMER, (timer.remaining_hops, timer.alert_time, timer.id)))
+
+    def timer_finished(self, timer_id: int):
+        self._put((_DELETE_TIMER, (timer_id,)))
+
+    timer_cancelled = timer_finished
+
+    def reminder_created(self, reminder):
+        self._put((_INSERT_REMINDER, _reminder_row(reminder)))
+
+    def reminder_fired(self, reminder_id: int):
+        self._put((_DELETE_REMINDER, (reminder_id,)))
+
+    reminder_cancelled = reminder_fired
+
+    # --------------------------------------------------
+    # Writer thread
+    # --------------------------------------------------
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+        return conn
+
+    def _write_batch(self, writes: List[Tuple[str, Sequence[Any]]]):
+        conn = self._conn
+        try:
+            conn.execute("BEGIN")
+            for sql, params in writes:
+                conn.execute(sql, params)
+            conn.execute("COMMIT")
+        except sqlite3.Error as exc:
+            logger.error("Failed to persist %s timer store writes: %s", len(writes), exc)
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+
+    def _writer_closed(self):
+        self._conn.close()
+        self._conn = None
+
+
+def _timer_row(timer) -> Tuple[Any, ...]:
+    return (
+        timer.id, timer.user_id, timer.channel_id, timer.guild_id,
+        timer.initial_duration, timer.region, timer.link, timer.hops, timer.remaining_hops,
+        timer.start_time, timer.alert_time,
+    )
+
+
+def _reminder_row(reminder) -> Tuple[Any, ...]:
+    return (
+        reminder.id, reminder.user_id, reminder.channel_id, reminder.keyword,
+        reminder.start_time, reminder.duration,
+    )
+
+
+# ------------------------------------------------------
+# Journal + snapshot store
+# ------------------------------------------------------
+# Every record is framed as <crc32, payload length, type> followed by the payload.
+# A torn write at the tail of the newest segment fails the CRC and is cut off.
+_FRAME = struct.Struct("<IIB")
+_TIMER_FIXED = struct.Struct("<qqqqiiiddHH")
+_TIMER_HOP = struct.Struct("<qid")
+_REMINDER_FIXED = struct.Struct("<qqqdiH")
+_ID = struct.Struct("<q")
+_SNAPSHOT_HEADER = struct.Struct("<8sQ")
+_SNAPSHOT_MAGIC = b"BOSSSNAP"
+
+TIMER_CREATE, TIMER_HOP, TIMER_FIRE, TIMER_CANCEL = 1, 2, 3, 4
+REMINDER_CREATE, REMINDER_FIRE, REMINDER_CANCEL = 5, 6, 7
+
+_TIMER_COLUMNS = (
+    "id", "user_id", "channel_id", "guild_id", "initial_duration", "hops", "remaining_hops",
+    "start_time", "alert_time",
+)
+_REMINDER_COLUMNS = ("id", "user_id", "channel_id", "start_time", "duration")
+
+
+def _frame(kind: int, payload: bytes) -> bytes:
+    body = _FRAME.pack(0, len(payload), kind)[4:] + payload
+    return struct.pack("<I", zlib.crc32(body)) + body
+
+
+def _encode_timer(row: Tuple[Any, ...]) -> bytes:
+    (timer_id, user_id, channel_id, guild_id, initial, region, link, hops, remaining,
+     start_time, alert_time) = row
+    region_b, link_b = region.encode(), link.encode()
+    return _frame(TIMER_CREATE, _TIMER_FIXED.pack(
+        timer_id, user_id or 0, channel_id or 0, guild_id or 0, initial, hops, remaining,
+        start_time, alert_time, len(region_b), len(link_b),
+    ) + region_b + link_b)
+
+
+def _encode_reminder(row: Tuple[Any, ...]) -> bytes:
+    reminder_id, user_id, channel_id, keyword, start_time, duration = row
+    keyword_b = keyword.encode()
+    return _frame(REMINDER_CREATE, _REMINDER_FIXED.pack(
+        reminder_id, user_id, channel_id or 0, start_time, duration, len(keyword_b),
+    ) + keyword_b)
+
+
+def _read_records(data: bytes) -> Iterator[Tuple[int, bytes, int]]:
+    """Yield (type, payload, end offset) until the data runs out or a record fails its CRC."""
+    offset = 0
+    while offset + _FRAME.size <= len(data):
+        crc, length, kind = _FRAME.unpack_from(data, offset)
+        start = offset + _FRAME.size
+        payload = data[start:start + length]
+        if len(payload) < length or zlib.crc32(data[offset + 4:start] + payload) != crc:
+            return
+        offset = start + length
+        yield kind, payload, offset
+
+
+class _JournalState:
+    """The timers/reminders a sequence of journal records adds up to."""
+
+    def __init__(self):
+        self.timers: Dict[int, Dict[str, Any]] = {}
+        self.reminders: Dict[int, Dict[str, Any]] = {}
+
+    def apply(self, kind: int, payload: bytes):
+        if kind == TIMER_CREATE:
+            fixed = _TIMER_FIXED.unpack_from(payload)
+            row = dict(zip(_TIMER_COLUMNS, fixed[:9]))
+            for key in ("user_id", "channel_id", "guild_id"):
+                row[key] = row[key] or None
+            pos = _TIMER_FIXED.size
+            row["region"] = payload[pos:pos + fixed[9]].decode()
+            pos += fixed[9]
+            row["link"] = payload[pos:pos + fixed[10]].decode()
+            self.timers[row["id"]] = row
+        elif kind == TIMER_HOP:
+            timer_id, remaining, alert_time = _TIMER_HOP.unpack(payload)
+            row = self.timers.get(timer_id)
+            if row is not None:
+                row["remaining_hops"] = remaining
+                row["alert_time"] = alert_time
+        elif kind in (TIMER_FIRE, TIMER_CANCEL):
+            self.timers.pop(_ID.unpack(payload)[0], None)
+        elif kind == REMINDER_CREATE:
+            fixed = _REMINDER_FIXED.unpack_from(payload)
+            row = dict(zip(_REMINDER_COLUMNS, fixed[:5]))
+            row["channel_id"] = row["channel_id"] or None
+            row["keyword"] = payload[_REMINDER_FIXED.size:_REMINDER_FIXED.size + fixed[5]].decode()
+            self.reminders[row["id"]] = row
+        elif kind in (REMINDER_FIRE, REMINDER_CANCEL):
+            self.reminders.pop(_ID.unpack(payload)[0], None)
+
+    def replay(self, data: bytes) -> int:
+        """Apply every intact record in `data`; returns how many bytes were valid."""
+        end = 0
+        for kind, payload, end in _read_records(data):
+            self.apply(kind, payload)
+        return end
+
+    def encode(self) -> bytes:
+        parts = []
+        for row in self.timers.values():
+            parts.append(_encode_timer((
+                row["id"], row["user_id"], row["channel_id"], row["guild_id"], row["initial_duration"],
+                row["region"], row["link"], row["hops"], row["remaining_hops"], row["start_time"],
+                row["alert_time"],
+            )))
+        for row in self.reminders.values():
+            parts.append(_encode_reminder((
+                row["id"], row["user_id"], row["channel_id"], row["keyword"], row["start_time"],
+                row["duration"],
+            )))
+        return b"".join(parts)
+
+
+class JournalStore(_BackgroundWriter):
+    """
+    Event-sourced alternative to TimerStore for very large populations.
+
+    Each create, hop, fire and cancel is appended as one binary record to the newest
+    journal segment (`journal.<n>`). Once a segment has collected `compact_every`
+    records, or `compact_interval` seconds have passed, the writer starts a fresh
+    segment and a compaction thread folds the old ones into `snapshot` in the
+    background. Startup loads the snapshot and replays only the segments after it.
+    """
+
+    thread_name = "timer-journal"
+
+    def __init__(self, directory: str, batch_size: int = 500, compact_every: int = 100_000,
+                 compact_interval: float = 3600.0, fsync: bool = False):
+        super().__init__(batch_size)
+        self.directory = directory
+        self.compact_every = compact_every
+        self.compact_interval = compact_interval
+        self.fsync = fsync
+        self._segment = 0
+        self._file = None
+        self._records = 0
+        self._segment_started = 0.0
+        self._compactor: Optional[threading.Thread] = None
+
+    def open(self) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]]]:
+        os.makedirs(self.directory, exist_ok=True)
+        state = _JournalState()
+        covered = self._load_snapshot(state)
+        segments = [n for n in self._segments() if n > covered]
+        for n in segments:
+            path = self._segment_path(n)
+            with open(path, "rb") as f:
+                data = f.read()
+            valid = state.replay(data)
+            if valid < len(data):
+                logger.warning("Journal segment %s has a torn tail; dropping %s bytes", path, len(data) - valid)
+                with open(path, "r+b") as f:
+                    f.truncate(valid)
+
+        self._segment = max([covered] + segments) + 1
+        self._open_segment()
+        self._start_writer()
+        timers = sorted(state.timers.values(), key=lambda row: row["id"])
+        reminders = sorted(state.reminders.values(), key=lambda row: row["id"])
+        logger.info("💾 Loaded %s timers and %s reminders from %s (snapshot through segment %s, replayed %s)",
+                    len(timers), len(reminders), self.directory, covered, len(segments))
+        return timers, reminders
+
+    def close(self):
+        super().close()
+        if self._compactor is not None:
+            self._compactor.join()
+
+    # --------------------------------------------------
+    # Mutations (called from the event loop)
+    # --------------------------------------------------
+    def timer_created(self, timer):
+        self._put(_encode_timer(_timer_row(timer)))
+
+    def timer_hopped(self, timer):
+        self._put(_frame(TIMER_HOP, _TIMER_HOP.pack(timer.id, timer.remaining_hops, timer.alert_time)))
+
+    def timer_finished(self, timer_id: int):
+        self._put(_frame(TIMER_FIRE, _ID.pack(timer_id)))
+
+    def timer_cancelled(self, timer_id: int):
+        self._put(_frame(TIMER_CANCEL, _ID.pack(timer_id)))
+
+    def reminder_created(self, reminder):
+        self._put(_encode_reminder(_reminder_row(reminder)))
+
+    def reminder_fired(self, reminder_id: int):
+        self._put(_frame(REMINDER_FIRE, _ID.pack(reminder_id)))
+
+    def reminder_cancelled(self, reminder_id: int):
+        self._put(_frame(REMINDER_CANCEL, _ID.pack(reminder_id)))
+
+    # --------------------------------------------------
+    # Writer thread
+    # --------------------------------------------------
+    def _write_batch(self, writes: List[bytes]):
+        try:
+            self._file.write(b"".join(writes))
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+        except OSError as exc:
+            logger.error("Failed to append %s journal records: %s", len(writes), exc)
+            return
+        self._records += len(writes)
+        if self._records >= self.compact_every or (
+                self._records and time.monotonic() - self._segment_started >= self.compact_interval):
+            self._rotate()
+
+    def _writer_closed(self):
+        self._file.close()
+        self._file = None
+
+    def _open_segment(self):
+        self._file = open(self._segment_path(self._segment), "ab")
+        self._records = 0
+        self._segment_started = time.monotonic()
+
+    def _rotate(self):
+        if self._compactor is not None and self._compactor.is_alive():
+            return  # still folding the previous rotation; keep appending here
+        self._file.close()
+        sealed = self._segment
+        self._segment += 1
+        self._open_segment()
+        self._compactor = threading.Thread(
+            target=self._compact, args=(sealed,), name="timer-journal-compact", daemon=True
+        )
+        self._compactor.start()
+
+    # --------------------------------------------------
+    # Snapshot / compaction
+    # --------------------------------------------------
+    def _compact(self, through: int):
+        started = time.perf_counter()
+        state = _JournalState()
+        covered = self._load_snapshot(state)
+        sealed = [n for n in self._segments() if covered < n <= through]
+        for n in sealed:
+            with open(self._segment_path(n), "rb") as f:
+                state.replay(f.read())
+
+        tmp = self._snapshot_path() + ".tmp"
+        with open(tmp, "wb") as f:
+            f.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, through))
+            f.write(state.encode())
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, self._snapshot_path())
+        for n in self._segments():
+            if n <= through:
+                os.remove(self._segment_path(n))
+        logger.info("💾 Compacted journal through segment %s: %s timers, %s reminders in %.2fs",
+                    through, len(state.timers), len(state.reminders), time.perf_counter() - started)
+
+    def _load_snapshot(self, state: _JournalState) -> int:
+        try:
+            with open(self._snapshot_path(), "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return 0
+        magic, through = _SNAPSHOT_HEADER.unpack_from(data)
+        if magic != _SNAPSHOT_MAGIC:
+            raise RuntimeError(f"{self._snapshot_path()} is not a timer snapshot")
+        state.replay(data[_SNAPSHOT_HEADER.size:])
+        return through
+
+    def _segments(self) -> List[int]:
+        segments = []
+        for name in os.listdir(self.directory):
+            prefix, _, suffix = name.partition(".")
+            if prefix == "journal" and suffix.isdigit():
+                segments.append(int(suffix))
+        return sorted(segments)
+
+    def _segment_path(self, n: int) -> str:
+        return os.path.join(self.directory, f"journal.{n}")
+
+    def _snapshot_path(self) -> str:
+        return os.path.join(self.directory, "snapshot")
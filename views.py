@@ -0,0 +1,180 @@
+from bisect import bisect_left, insort
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Iterable, Iterator, List, Optional, Tuple
+
+from delivery import MESSAGE_LIMIT
+from models import TimerData
+
+_ANY = object()
+
+
+class ResponseCache:
+    """
+    Rendered command responses keyed by scope (e.g. ("timers", guild_id)).
+
+    Responses that use Discord timestamps read the same until something they show
+    changes, so an entry lives until `invalidate` is called for its key, normally
+    from a registry subscriber, or until it is the least recently used of more than
+    `max_entries`. A disabled cache renders every time.
+    """
+
+    def __init__(self, enabled: bool = True, max_entries: int = 1024):
+        self.enabled = enabled
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Hashable, str]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, render: Callable[[], str]) -> str:
+        content = self._entries.get(key) if self.enabled else None
+        if content is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return content
+        self.misses += 1
+        content = render()
+        if self.enabled:
+            self._entries[key] = content
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return content
+
+    def invalidate(self, key: Hashable):
+        self._entries.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+def fit_lines(header: str, lines: Iterable[str], total: int, limit: int = MESSAGE_LIMIT) -> str:
+    """
+    `header` and as many of `lines` as fit in one message, joined by newlines.
+
+    When lines are left over the last one is replaced by "…and N more", where N
+    counts against `total`, the number of lines there would be in all. `lines` is
+    consumed lazily, so a long source costs only what actually gets shown.
+    """
+    shown: List[str] = [header]
+    length = len(header)
+    count = 0
+    for line in lines:
+        more = f"…and {total - count} more"
+        # keep room for the "more" line unless this is the last one
+        needed = length + 1 + len(line) + (0 if count == total - 1 else 1 + len(more))
+        if needed > limit:
+            shown.append(more)
+            break
+        shown.append(line)
+        length += 1 + len(line)
+        count += 1
+    return "\n".join(shown)
+
+
+class _Entry:
+    __slots__ = ("timer", "key", "line", "facets")
+
+    def __init__(self, timer: TimerData, key: Tuple[float, int], line: Optional[str], facets: List[Hashable]):
+        self.timer = timer
+        self.key = key
+        self.line = line
+        self.facets = facets
+
+
+class TimerView:
+    """
+    Active timers ordered by next alert, kept up to date from registry changes.
+
+    Every timer sits in a (alert_time, id) sorted list for all timers and one
+    each for its guild, region, channel and owner, so the next k timers for any
+    of those filters are the first k entries of one list: no scan and no sort at
+    query time. Combined filters walk the shortest matching list and check the
+    rest per timer. With `prerender` each timer's list line is built once per
+    change rather than on every query; turn it off when lines depend on the clock.
+    """
+
+    def __init__(self, render_line: Callable[[TimerData], str], prerender: bool = True):
+        self._render = render_line
+        self.prerender = prerender
+        self._entries: Dict[int, _Entry] = {}
+        self._orders: Dict[Hashable, List[Tuple[float, int]]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def on_change(self, change: str, timer: TimerData):
+        """Registry subscriber: `TimerRegistry.subscribe(view.on_change)`."""
+        self._discard(timer.id)
+        if change != "remove":
+            self._insert(timer)
+
+    def top(self, limit: Optional[int] = None, guild_id=_ANY, region: Optional[str] = None,
+            channel_id: Optional[int] = None, user_id: Optional[int] = None) -> Iterator[TimerData]:
+        """Matching timers, next alert first; stops after `limit` when given."""
+        for entry in self._matching(limit, guild_id, region, channel_id, user_id):
+            yield entry.timer
+
+    def lines(self, limit: Optional[int] = None, guild_id=_ANY, region: Optional[str] = None,
+              channel_id: Optional[int] = None, user_id: Optional[int] = None) -> Iterator[str]:
+        """Like `top`, but the rendered line of each timer."""
+        for entry in self._matching(limit, guild_id, region, channel_id, user_id):
+            yield entry.line if entry.line is not None else self._render(entry.timer)
+
+    def count(self, guild_id=_ANY, region: Optional[str] = None,
+              channel_id: Optional[int] = None, user_id: Optional[int] = None) -> int:
+        facets = self._facets(guild_id, region, channel_id, user_id)
+        if len(facets) <= 1:
+            return len(self._orders.get(facets[0], ())) if facets else len(self._entries)
+        return sum(1 for _ in self._matching(None, guild_id, region, channel_id, user_id))
+
+    # --------------------------------------------------
+    # Internals
+    # --------------------------------------------------
+    @staticmethod
+    def _facets(guild_id, region, channel_id, user_id) -> List[Hashable]:
+        facets: List[Hashable] = []
+        if guild_id is not _ANY:
+            facets.append(("guild", guild_id))
+        if region is not None:
+            facets.append(("region", region.casefold()))
+        if channel_id is not None:
+            facets.append(("channel", channel_id))
+        if user_id is not None:
+            facets.append(("owner", user_id))
+        return facets
+
+    def _matching(self, limit, guild_id, region, channel_id, user_id) -> Iterator[_Entry]:
+        facets = self._facets(guild_id, region, channel_id, user_id)
+        orders = [self._orders.get(facet, []) for facet in facets] or [self._orders.get("all", [])]
+        order = min(orders, key=len)
+        wanted = set(facets)
+        found = 0
+        for _, timer_id in order:
+            if limit is not None and found >= limit:
+                return
+            entry = self._entries[timer_id]
+            if len(wanted) > 1 and not wanted.issubset(entry.facets):
+                continue
+            found += 1
+            yield entry
+
+    def _insert(self, timer: TimerData):
+        facets: List[Hashable] = ["all", ("guild", timer.guild_id), ("region", timer.region.casefold())]
+        if timer.channel_id is not None:
+            facets.append(("channel", timer.channel_id))
+        if timer.user_id is not None:
+            facets.append(("owner", timer.user_id))
+        key = (timer.alert_time, timer.id)
+        line = self._render(timer) if self.prerender else None
+        self._entries[timer.id] = _Entry(timer, key, line, facets)
+        for facet in facets:
+            insort(self._orders.setdefault(facet, []), key)
+
+    def _discard(self, timer_id: int):
+        entry = self._entries.pop(timer_id, None)
+        if entry is None:
+            return
+        for facet in entry.facets:
+            order = self._orders[facet]
+            del order[bisect_left(order, entry.key)]
+            if not order:
+                del self._orders[facet]
@@ -0,0 +1,125 @@
+import logging
+from typing import Any, Dict, Iterable, Optional, Set
+
+import aiohttp
+
+logger = logging.getLogger("timer-bot")
+
+API_BASE = "https://discord.com/api/v10"
+WEBHOOK_NAME = "Boss Timer Alerts"
+
+
+class WebhookError(Exception):
+    """A webhook request Discord answered with an error status."""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+
+class WebhookSender:
+    """
+    Sends alerts for opted-in channels through a channel webhook instead of the bot.
+
+    Webhook executions are rate-limited per webhook, not on the bot's own buckets,
+    so an alert storm no longer competes with slash-command responses. Every request
+    goes through one shared ClientSession, so connections are pooled and kept alive.
+    The webhook for a channel is looked up (or created) on first use and its
+    execute URL cached; a 404 means it was deleted and it is looked up again.
+
+    A channel where the bot may not manage webhooks is switched back to normal
+    sends for the rest of the run. Webhook executes take no nonce, so unlike
+    bot sends a repeat after a lost acknowledgement is not deduplicated.
+    """
+
+    def __init__(self, token: str, channel_ids: Iterable[int], api_base: str = API_BASE,
+                 name: str = WEBHOOK_NAME, connections: int = 20, timeout: float = 10.0):
+        self.token = token
+        self.channel_ids: Set[int] = set(channel_ids)
+        self.api_base = api_base.rstrip("/")
+        self.name = name
+        self.connections = connections
+        self.timeout = timeout
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._urls: Dict[int, str] = {}
+        self._disabled: Set[int] = set()
+        self.sent = 0
+        self.lookups = 0
+
+    async def start(self):
+        if self._session is None and self.channel_ids:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.connections, ttl_dns_cache=300),
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    def handles(self, channel_id: int) -> bool:
+        return channel_id in self.channel_ids and channel_id not in self._disabled
+
+    async def send(self, channel_id: int, content: str, allowed_mentions: Optional[Dict[str, Any]] = None) -> bool:
+        """Post `content` through the channel's webhook; False if the channel cannot use one."""
+        payload: Dict[str, Any] = {"content": content}
+        if allowed_mentions is not None:
+            payload["allowed_mentions"] = allowed_mentions
+        for attempt in range(2):
+            url = await self._webhook_url(channel_id)
+            if url is None:
+                return False
+            async with self._session.post(url, json=payload) as response:
+                if response.status == 404 and attempt == 0:
+                    self._urls.pop(channel_id, None)  # webhook was deleted; find or make another
+                    continue
+                if response.status >= 400:
+                    raise WebhookError(response.status, await response.text())
+                self.sent += 1
+                return True
+        return False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "channels": len(self.channel_ids),
+            "cached": len(self._urls),
+            "disabled": len(self._disabled),
+            "sent": self.sent,
+            "lookups": self.lookups,
+        }
+
+    # --------------------------------------------------
+    # Internals
+    # --------------------------------------------------
+    async def _webhook_url(self, channel_id: int) -> Optional[str]:
+        url = self._urls.get(channel_id)
+        if url is not None:
+            return url
+        self.lookups += 1
+        headers = {"Authorization": f"Bot {self.token}"}
+        endpoint = f"{self.api_base}/channels/{channel_id}/webhooks"
+
+        async with self._session.get(endpoint, headers=headers) as response:
+            if response.status == 403:
+                return self._disable(channel_id)
+            if response.status >= 400:
+                raise WebhookError(response.status, await response.text())
+            hooks = await response.json()
+        hook = next((h for h in hooks if h.get("name") == self.name and h.get("token")), None)
+
+        if hook is None:
+            async with self._session.post(endpoint, headers=headers, json={"name": self.name}) as response:
+                if response.status == 403:
+                    return self._disable(channel_id)
+                if response.status >= 400:
+                    raise WebhookError(response.status, await response.text())
+                hook = await response.json()
+
+        url = self._urls[channel_id] = f"{self.api_base}/webhooks/{hook['id']}/{hook['token']}?wait=true"
+        return url
+
+    def _disable(self, channel_id: int) -> None:
+        logger.warning("No permission to manage webhooks in channel %s; sending as the bot there", channel_id)
+        self._disabled.add(channel_id)
+        return None